@@ -0,0 +1,285 @@
+"""
+bench_graph_loader.py
+Benchmark the rules.yml graph loader (new.py) without a live Neo4j.
+
+`neo4j.GraphDatabase.driver` is swapped for a recording stand-in before the loader is
+imported. The stand-in counts sessions, transactions, statements, round trips and rows
+sent, keeps the record hashes it was given (so the unchanged-row pre-pass behaves like
+a real second run), and sleeps `--latency-ms` per round trip to model the network.
+
+Synthetic descriptions are generated from the sample file: names, flight numbers and
+passport numbers are varied while the sentence shapes (and so the regex hits) stay
+the same. Flights come from a small pool, so same-flight derivation has work to do.
+
+Usage:
+  python bench_graph_loader.py --rows 10000 --rows 100000 --latency-ms 1
+  python bench_graph_loader.py --rows 1000000 --workers 8 --max-statements-per-row 0.02 --min-rows-per-sec 5000
+  python bench_graph_loader.py --rows 10000 --rerun          (second pass: everything unchanged)
+
+Exit status is 1 when a budget (--max-statements-per-row, --min-rows-per-sec) is missed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import neo4j
+import pandas as pd
+
+SAMPLE_PATH = Path("descriptions_only.xlsx")
+
+FIRST_NAMES = [
+    "John", "Sara", "Michael", "Fatima", "Abebe", "Maria", "Hassan", "Linda", "Yared", "Omar",
+    "Amina", "David", "Hana", "Samuel", "Lucia", "Tariq", "Grace", "Daniel", "Leila", "Peter",
+]
+LAST_NAMES = [
+    "Doe", "Ahmed", "Lee", "Yusuf", "Kebede", "Rodriguez", "Ali", "Park", "Teshome", "Hassan",
+    "Mensah", "Okafor", "Haile", "Novak", "Silva", "Karimi", "Osei", "Bekele", "Moreau", "Tanaka",
+]
+
+_LEADING_NAME = re.compile(r"^[A-Z][a-z]+(?:\s+[A-Z][a-z]+)+")
+_FLIGHT = re.compile(r"\b[A-Z]{2}\d{3,4}\b")
+_PASSPORT = re.compile(r"\b[A-Z]{1,2}\d{6,8}\b")
+
+
+# --- RECORDING STAND-IN DRIVER ---
+class RecordingResult:
+    def __init__(self, rows: Optional[List[Dict[str, Any]]] = None) -> None:
+        self._rows = rows or []
+
+    def consume(self) -> None:
+        return None
+
+    def data(self) -> List[Dict[str, Any]]:
+        return list(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class RecordingTransaction:
+    def __init__(self, driver: "RecordingDriver") -> None:
+        self.driver = driver
+
+    def run(self, cypher: str, parameters: Optional[Dict[str, Any]] = None, **params: Any) -> RecordingResult:
+        return self.driver._statement(cypher, {**(parameters or {}), **params})
+
+
+class RecordingSession:
+    def __init__(self, driver: "RecordingDriver") -> None:
+        self.driver = driver
+
+    def __enter__(self) -> "RecordingSession":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        return None
+
+    def run(self, cypher: str, parameters: Optional[Dict[str, Any]] = None, **params: Any) -> RecordingResult:
+        # Auto-commit: the statement and its commit share one round trip
+        self.driver._count("auto_commit_transactions")
+        return self.driver._statement(cypher, {**(parameters or {}), **params})
+
+    def _managed(self, work, *args: Any, **kwargs: Any) -> Any:
+        self.driver._count("transactions")
+        result = work(RecordingTransaction(self.driver), *args, **kwargs)
+        self.driver._round_trip()  # commit
+        return result
+
+    execute_write = _managed
+    execute_read = _managed
+    write_transaction = _managed
+    read_transaction = _managed
+
+
+class RecordingDriver:
+    """Counts what the loader sends; thread-safe because the loader writes from a writer thread."""
+
+    def __init__(self, latency_s: float = 0.0) -> None:
+        self.latency_s = latency_s
+        self.counts: Counter = Counter()
+        self.statements: Counter = Counter()  # per statement shape
+        self.hashes: Dict[str, str] = {}      # record_id -> content_hash written so far
+        self._lock = threading.Lock()
+
+    def session(self, **kwargs: Any) -> RecordingSession:
+        self._count("sessions")
+        return RecordingSession(self)
+
+    def close(self) -> None:
+        return None
+
+    def verify_connectivity(self) -> None:
+        return None
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.counts[key] += n
+
+    def _round_trip(self) -> None:
+        self._count("round_trips")
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def _statement(self, cypher: str, params: Dict[str, Any]) -> RecordingResult:
+        rows = params.get("rows") or []
+        shape = next((ln.strip() for ln in cypher.splitlines() if ln.strip().startswith(("MERGE", "MATCH", "CREATE", "SET"))), "?")
+        with self._lock:
+            self.counts["statements"] += 1
+            self.counts["rows_sent"] += len(rows)
+            self.statements[shape[:70]] += 1
+            if rows and "content_hash" in rows[0]:
+                for r in rows:
+                    self.hashes[r["record_id"]] = r["content_hash"]
+        self._round_trip()
+        if "ids" in params:  # stored-hash lookup of the unchanged-row pre-pass
+            return RecordingResult([
+                {"record_id": i, "content_hash": self.hashes[i]} for i in params["ids"] if i in self.hashes
+            ])
+        return RecordingResult()
+
+    def snapshot(self) -> Counter:
+        with self._lock:
+            return Counter(self.counts)
+
+
+RECORDER = RecordingDriver()
+neo4j.GraphDatabase.driver = lambda *args, **kwargs: RECORDER  # before the loader creates its driver
+
+import new as loader  # noqa: E402
+
+
+# --- SYNTHETIC DATA ---
+def synthetic_descriptions(n: int, seed: int = 7, flights: int = 500) -> pd.DataFrame:
+    """`n` descriptions shaped like the sample file, with varied names, flights and passports."""
+    rng = random.Random(seed)
+    templates = [str(t) for t in pd.read_excel(SAMPLE_PATH)["description"].dropna()]
+    flight_pool = [f"{rng.choice(['ET', 'KQ', 'TK', 'MS', 'EK', 'BA'])}{rng.randint(100, 9999)}" for _ in range(flights)]
+    out: List[str] = []
+    for _ in range(n):
+        text = rng.choice(templates)
+        text = _LEADING_NAME.sub(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", text, count=1)
+        text = _FLIGHT.sub(lambda m: rng.choice(flight_pool), text)
+        text = _PASSPORT.sub(lambda m: f"{rng.choice('ABCEKPSU')}{rng.choice('ABCEKPSU')}{rng.randint(100000, 99999999)}", text)
+        out.append(text)
+    return pd.DataFrame({"description": out})
+
+
+# --- BENCHMARK ---
+def _phase(name: str, fn, report: Dict[str, Any]):
+    before = RECORDER.snapshot()
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+    delta = RECORDER.snapshot()
+    delta.subtract(before)
+    report["phases"][name] = {"seconds": round(seconds, 3), **{k: v for k, v in delta.items() if v}}
+    return result
+
+
+def run(rows: int, workers: int, extract_timing: bool, rerun: bool) -> List[Dict[str, Any]]:
+    """One report per pass (two with `rerun`)."""
+    df = synthetic_descriptions(rows)
+    RECORDER.hashes.clear()
+    base: Dict[str, Any] = {"rows": rows, "workers": workers, "latency_ms": RECORDER.latency_s * 1000}
+
+    if extract_timing:
+        texts = df["description"].tolist()
+        t0 = time.perf_counter()
+        loader.extract_many(texts)
+        secs = time.perf_counter() - t0
+        base["extract_seconds_single_core"] = round(secs, 3)
+        base["extract_rows_per_sec_single_core"] = round(rows / secs, 1) if secs else None
+
+    reports: List[Dict[str, Any]] = []
+    for i in range(2 if rerun else 1):
+        RECORDER.counts.clear()
+        RECORDER.statements.clear()
+        loader.ENTITY_CACHE = loader.EntityCache(loader.ENTITY_CACHE_SIZE)  # fresh process per run
+        report: Dict[str, Any] = {**base, "phases": {}}
+        t0 = time.perf_counter()
+        _phase("schema", loader.ensure_schema, report)
+        planned = _phase("plan+skip_unchanged", lambda: loader.skip_unchanged(loader.plan_records(df)), report)
+        touched = _phase("load_graph", lambda: loader.load_graph(planned, workers=workers), report)
+        _phase("touch_entities", loader.touch_cached_entities, report)
+        _phase("same_flight", lambda: loader.create_same_flight_relationships(touched), report)
+        total = time.perf_counter() - t0
+        counts = RECORDER.snapshot()
+        report.update({
+            "pass": i + 1,
+            "rows_loaded": len(planned),
+            "seconds": round(total, 3),
+            "rows_per_sec": round(rows / total, 1) if total else None,
+            "sessions": counts["sessions"],
+            "transactions": counts["transactions"] + counts["auto_commit_transactions"],
+            "statements": counts["statements"],
+            "round_trips": counts["round_trips"],
+            "rows_sent": counts["rows_sent"],
+            "statements_per_row": round(counts["statements"] / rows, 4),
+            "round_trips_per_row": round(counts["round_trips"] / rows, 4),
+            "top_statements": RECORDER.statements.most_common(8),
+        })
+        reports.append(report)
+    return reports
+
+
+def print_report(r: Dict[str, Any]) -> None:
+    print(f"\n=== {r['rows']:,} rows | workers={r['workers']} | latency={r['latency_ms']:.1f} ms | pass {r['pass']} ===")
+    if "extract_seconds_single_core" in r:
+        print(f"  extraction (1 core): {r['extract_seconds_single_core']}s "
+              f"({r['extract_rows_per_sec_single_core']:,} rows/s)")
+    print(f"  load: {r['seconds']}s, {r['rows_per_sec']:,} rows/s, {r['rows_loaded']:,} rows written")
+    print(f"  sessions={r['sessions']} transactions={r['transactions']} statements={r['statements']} "
+          f"round_trips={r['round_trips']} rows_sent={r['rows_sent']:,}")
+    print(f"  statements/row={r['statements_per_row']} round_trips/row={r['round_trips_per_row']}")
+    for name, ph in r["phases"].items():
+        print(f"    {name:20} {ph['seconds']:>8}s  statements={ph.get('statements', 0)}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the graph loader against a recording stand-in driver.")
+    ap.add_argument("--rows", type=int, action="append", default=None,
+                    help="Synthetic rows per run. Repeatable. Default: 10000")
+    ap.add_argument("--workers", type=int, default=loader.EXTRACT_WORKERS,
+                    help="Extraction processes (0 = in-process). Default: the loader's EXTRACT_WORKERS")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="Simulated latency per round trip. Default: 0")
+    ap.add_argument("--no-extract-timing", action="store_true", help="Skip the separate single-core extraction timing.")
+    ap.add_argument("--rerun", action="store_true", help="Load twice and report the second (unchanged) pass.")
+    ap.add_argument("--max-statements-per-row", type=float, default=None, help="Budget: fail above this.")
+    ap.add_argument("--min-rows-per-sec", type=float, default=None, help="Budget: fail below this.")
+    ap.add_argument("--json", default=None, metavar="PATH", help="Also write the reports as JSON.")
+    args = ap.parse_args(argv)
+
+    RECORDER.latency_s = args.latency_ms / 1000.0
+    loader.DEBUG_RECORDS = False
+    reports = []
+    failed = False
+    for rows in args.rows or [10000]:
+        for r in run(rows, args.workers, not args.no_extract_timing, args.rerun):
+            print_report(r)
+            if args.max_statements_per_row is not None and r["statements_per_row"] > args.max_statements_per_row:
+                print(f"  [BUDGET] statements/row {r['statements_per_row']} > {args.max_statements_per_row}")
+                failed = True
+            if args.min_rows_per_sec is not None and (r["rows_per_sec"] or 0) < args.min_rows_per_sec:
+                print(f"  [BUDGET] rows/sec {r['rows_per_sec']} < {args.min_rows_per_sec}")
+                failed = True
+            reports.append(r)
+    if args.json:
+        Path(args.json).write_text(json.dumps(reports, indent=2), encoding="utf-8")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
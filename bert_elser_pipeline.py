@@ -6,16 +6,29 @@ Design:
 - No license or deployment probing up front.
 - Indexing: if ELSER is available, you may attach an ingest pipeline to produce ml.description_tokens.
   If not, indexing still works; you just won’t have semantic tokens.
+  Duplicate reuse and passage chunking infer client-side instead (see _infer_ml).
 - Search: first attempt ELSER text_expansion + BM25. On any 4xx/5xx error, transparently retry BM25-only.
+- Entities (optional): the rules.yml regex extractor runs during ingest and stores keyword
+  fields under `entities`, usable as filters and as facets (terms aggregations).
+- Snapshots: export_index() dumps every document (sources including ml tokens) with sliced
+  point-in-time searches; restore_index() bulk-loads a dump without the ingest pipeline,
+  so a rebuilt cluster skips ELSER inference entirely.
 
 This avoids false negatives from license/deployment checks and works across cluster configs.
 """
 
 from __future__ import annotations
 
-from datetime import datetime
+import gzip
+import json
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, Iterable, Optional, List, Sequence, Union
+from typing import Dict, Any, Iterable, Iterator, Optional, List, Sequence, Tuple, Union
 
 import pandas as pd
 from dateutil import parser as dtparser
@@ -23,6 +36,10 @@ from elasticsearch import Elasticsearch, helpers
 from elasticsearch.helpers import BulkIndexError
 from elastic_transport import ApiError
 
+from dedup import group_near_duplicates
+from field_extractor import FieldExtractor
+from profiling import span, traced
+
 
 def _coerce_str(v) -> Optional[str]:
     if v is None:
@@ -31,6 +48,7 @@ def _coerce_str(v) -> Optional[str]:
     return s if s else None
 
 
+@traced("to_iso")
 def to_iso(v) -> Optional[str]:
     if pd.isna(v):
         return None
@@ -42,6 +60,189 @@ def to_iso(v) -> Optional[str]:
         return None
 
 
+def _as_utc(dt: datetime) -> datetime:
+    """Naive datetimes are UTC, as Elasticsearch reads them; aware ones are converted."""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def read_table(path: Union[str, Path], nrows: Optional[int] = None) -> pd.DataFrame:
+    """Read a .csv/.xlsx/.xls file. `nrows` limits parsing to the header plus the first rows."""
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(p)
+    suffix = p.suffix.lower()
+    if suffix == ".csv":
+        return pd.read_csv(p, nrows=nrows)
+    if suffix == ".xlsx":
+        # openpyxl engine required for some environments
+        return pd.read_excel(p, engine="openpyxl", nrows=nrows)
+    if suffix == ".xls":
+        return pd.read_excel(p, nrows=nrows)
+    raise ValueError("Only .csv, .xlsx, or .xls are supported")
+
+
+def iter_table(path: Union[str, Path], chunk_size: int = 5000) -> Iterator[pd.DataFrame]:
+    """
+    Stream a .csv/.xlsx/.xls file as DataFrame chunks. The index keeps counting across
+    chunks (row position in the whole file), as if the file had been read at once.
+    """
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(p)
+    suffix = p.suffix.lower()
+    if suffix == ".csv":
+        yield from pd.read_csv(p, chunksize=chunk_size)
+    elif suffix == ".xlsx":
+        from openpyxl import load_workbook
+
+        wb = load_workbook(p, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(next(rows, ()))]
+            start, chunk = 0, []
+            for values in rows:
+                if all(v is None for v in values):
+                    continue  # read_excel skips blank rows too
+                chunk.append(values[:len(header)])
+                if len(chunk) >= chunk_size:
+                    yield pd.DataFrame(chunk, columns=header, index=range(start, start + len(chunk)))
+                    start, chunk = start + len(chunk), []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=header, index=range(start, start + len(chunk)))
+        finally:
+            wb.close()
+    elif suffix == ".xls":
+        # xlrd has no streaming reader; parse once and slice
+        df = pd.read_excel(p)
+        for i in range(0, len(df), chunk_size):
+            yield df.iloc[i:i + chunk_size]
+    else:
+        raise ValueError("Only .csv, .xlsx, or .xls are supported")
+
+
+# Index snapshots (export_index / restore_index): file suffix -> format
+SNAPSHOT_SUFFIXES = {
+    ".ndjson.gz": "ndjson.gz",
+    ".jsonl.gz": "ndjson.gz",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".parquet": "parquet",
+}
+
+
+def snapshot_format(path: Union[str, Path]) -> str:
+    name = str(path).lower()
+    for suffix, fmt in SNAPSHOT_SUFFIXES.items():
+        if name.endswith(suffix):
+            return fmt
+    raise ValueError(f"Snapshot files must end in one of {list(SNAPSHOT_SUFFIXES)}, got {path}")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet snapshots need pyarrow: pip install pyarrow") from e
+    return pa, pq
+
+
+class SnapshotWriter:
+    """
+    Thread-safe snapshot sink. Each document is one `{"_id", "_source"}` record: a line of
+    (gzipped) NDJSON, or a Parquet row with `_id` and the JSON-encoded `_source` (zstd), since
+    sources are schemaless and token maps have a different key set per document.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.format = snapshot_format(self.path)
+        self._lock = threading.Lock()
+        self._parquet = None
+        if self.format == "parquet":
+            pa, pq = _import_pyarrow()
+            self._pa = pa
+            self._schema = pa.schema([("_id", pa.string()), ("_source", pa.string())])
+            self._parquet = pq.ParquetWriter(str(self.path), self._schema, compression="zstd")
+        elif self.format == "ndjson.gz":
+            self._file = gzip.open(self.path, "wt", encoding="utf-8", compresslevel=6)
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+
+    def write(self, docs: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        # Serialize outside the lock so export slices only contend on the actual write
+        if self._parquet is not None:
+            table = self._pa.table(
+                {
+                    "_id": [d[0] for d in docs],
+                    "_source": [json.dumps(d[1], ensure_ascii=False, separators=(",", ":")) for d in docs],
+                },
+                schema=self._schema,
+            )
+            with self._lock:
+                self._parquet.write_table(table)
+            return
+        lines = "".join(
+            json.dumps({"_id": i, "_source": src}, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for i, src in docs
+        )
+        with self._lock:
+            self._file.write(lines)
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+        else:
+            self._file.close()
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def iter_snapshot(path: Union[str, Path], batch_size: int = 1000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Stream (_id, _source) pairs from a snapshot written by SnapshotWriter."""
+    fmt = snapshot_format(path)
+    if fmt == "parquet":
+        _, pq = _import_pyarrow()
+        for batch in pq.ParquetFile(str(path)).iter_batches(batch_size=batch_size, columns=["_id", "_source"]):
+            ids, sources = batch.column(0).to_pylist(), batch.column(1).to_pylist()
+            for doc_id, src in zip(ids, sources):
+                yield doc_id, json.loads(src)
+        return
+    opener = gzip.open if fmt == "ndjson.gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                yield rec["_id"], rec["_source"]
+
+
+# Mapping types accepted for declared filter columns
+FILTER_FIELD_TYPES = ("keyword", "long", "integer", "short", "double", "float", "date", "boolean")
+DYNAMIC_POLICIES = (True, False, "strict", "runtime")
+
+# Time-partitioned layout: <index_name>-YYYY.MM behind an <index_name> alias
+PARTITION_MODES = (None, "monthly")
+UNDATED_PARTITION = "undated"
+PARTITION_SUFFIX_RE = re.compile(rf"^(\d{{4}}\.\d{{2}}|{UNDATED_PARTITION})$")
+MAX_ROUTED_PARTITIONS = 120  # wider date ranges just search the alias
+
+# Pre-inference duplicate handling
+DEDUP_MODES = (None, "reuse", "collapse")
+
+# Subfield added under description_col for each typeahead mode
+TYPEAHEAD_MODES = (None, "search_as_you_type", "index_prefixes")
+TYPEAHEAD_SUBFIELD = "typeahead"
+
+# Extracted entities live under this object field (keyword subfields per rules.yml field)
+ENTITIES_FIELD = "entities"
+
+
 class BertDescriptionElser:
     def __init__(
         self,
@@ -54,38 +255,334 @@ class BertDescriptionElser:
         description_col: str = "Description",
         request_timeout: int = 120,
         use_ml: bool = True,
+        es_hosts: Optional[Sequence[str]] = None,
+        sniff_on_start: bool = False,
+        sniff_on_node_failure: bool = False,
+        connections_per_node: Optional[int] = None,
+        http_compress: bool = False,
+        ingest_threads: int = 1,
+        typeahead: Optional[str] = None,
+        dynamic: Union[bool, str] = True,
+        filter_fields: Optional[Dict[str, str]] = None,
+        display_fields: Optional[Sequence[str]] = None,
+        sort_by_timestamp: bool = False,
+        partition: Optional[str] = None,
+        dedup: Optional[str] = None,
+        dedup_threshold: float = 0.9,
+        infer_batch_size: int = 32,
+        chunking: bool = False,
+        passage_words: int = 200,
+        passage_overlap: int = 50,
+        entity_rules: Optional[Union[str, Path]] = None,
+        graph_context: Optional[Any] = None,
     ) -> None:
+        """
+        `es_hosts` (or a comma-separated `es_url`) lists several nodes; requests are
+        spread round-robin across them. Sniffing discovers the rest of the cluster on
+        start and/or after a node failure. The per-node connection pool is sized to at
+        least `ingest_threads` so parallel bulk workers never wait on a connection.
+
+        `typeahead` ("search_as_you_type" or "index_prefixes") adds a prefix-friendly
+        subfield under `description_col` that `suggest()` queries.
+
+        Mapping profile: `dynamic` (True, False, "strict" or "runtime") controls how
+        undeclared columns are mapped; `filter_fields` maps column -> keyword/numeric/date
+        type for cheap filtering; `display_fields` are kept in _source but not indexed;
+        `sort_by_timestamp` sorts index segments by timestamp (creation time only).
+
+        `partition="monthly"` writes documents to `<index_name>-YYYY.MM` by their detected
+        timestamp (`<index_name>-undated` otherwise); `index_name` becomes an alias over
+        all partitions, date-filtered searches only hit overlapping months, and retention
+        is `drop_partitions_before()`.
+
+        `dedup` groups exact and near-duplicate descriptions (MinHash/LSH, see dedup.py)
+        before inference: "reuse" infers one token map per group client-side and copies it
+        to every member; "collapse" indexes one document per group with `duplicate_count`.
+
+        `entity_rules` (a rules.yml path) runs the graph loader's regex extractor on every
+        description during ingest and stores the values as keyword fields, e.g.
+        `entities.person.flight_number` and `entities.locations`. Filters and `facets()`
+        accept those paths or their short names (`flight_number`, `organization`, `locations`).
+
+        `graph_context` (a graph_context.GraphContext) lets `semantic_search(with_graph=True)`
+        attach each hit's Neo4j neighborhood, fetched for the whole page in one query.
+        """
+        if typeahead not in TYPEAHEAD_MODES:
+            raise ValueError(f"typeahead must be one of {TYPEAHEAD_MODES}, got {typeahead!r}")
+        if partition not in PARTITION_MODES:
+            raise ValueError(f"partition must be one of {PARTITION_MODES}, got {partition!r}")
+        if dedup not in DEDUP_MODES:
+            raise ValueError(f"dedup must be one of {DEDUP_MODES}, got {dedup!r}")
+        if chunking and not 0 <= passage_overlap < passage_words:
+            raise ValueError("passage_overlap must be >= 0 and smaller than passage_words.")
+        if dynamic not in DYNAMIC_POLICIES:
+            raise ValueError(f"dynamic must be one of {DYNAMIC_POLICIES}, got {dynamic!r}")
+        for col, typ in (filter_fields or {}).items():
+            if typ not in FILTER_FIELD_TYPES:
+                raise ValueError(f"Unsupported type {typ!r} for filter field '{col}'. Use one of {FILTER_FIELD_TYPES}")
+        hosts = list(es_hosts) if es_hosts else [h.strip() for h in es_url.split(",") if h.strip()]
+        self.ingest_threads = max(1, int(ingest_threads))
+        if connections_per_node is None:
+            connections_per_node = max(10, self.ingest_threads + 2)
         self.es = Elasticsearch(
-            es_url,
+            hosts,
             basic_auth=(es_user, es_pass),
             request_timeout=request_timeout,
             verify_certs=False,
+            sniff_on_start=sniff_on_start,
+            sniff_on_node_failure=sniff_on_node_failure,
+            connections_per_node=connections_per_node,
+            node_selector_class="round_robin",
+            http_compress=http_compress,
         )
         self.index_name = index_name
         self.pipeline_id = pipeline_id
         self.model_id = model_id
         self.description_col = description_col
         self.use_ml_requested = use_ml  # user preference to try ELSER
+        self.typeahead = typeahead
+        self.dynamic = dynamic
+        self.filter_fields: Dict[str, str] = dict(filter_fields or {})
+        self.display_fields: List[str] = list(display_fields or [])
+        self.sort_by_timestamp = sort_by_timestamp
+        self.last_ingest_stats: Dict[str, Any] = {}
+        self.partition = partition
+        self.dedup = dedup
+        self.dedup_threshold = dedup_threshold
+        self.infer_batch_size = max(1, int(infer_batch_size))
+        self.chunking = chunking
+        self.passage_words = passage_words
+        self.passage_overlap = passage_overlap
+        # Set once chunked documents went through the ingest pipeline instead (whole-description
+        # ml.description_tokens, no passages); searches then query both fields.
+        self.passages_fallback = False
+        self._infer_lock = threading.Lock()
+        self._infer_counters: Dict[str, int] = {"inference_requests": 0, "truncated_inputs": 0}
+        self.extractor: Optional[FieldExtractor] = None
+        self.location_fields: List[str] = []
+        self.entity_fields: Dict[str, str] = {}  # short name -> field path
+        self.graph_context = graph_context
+        if entity_rules:
+            self._load_entity_rules(entity_rules)
+
+    def _load_entity_rules(self, path: Union[str, Path]) -> None:
+        import yaml  # only needed with entity extraction
+
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Missing rules file: {path}")
+        with open(path, "r", encoding="utf-8") as f:
+            rules = yaml.safe_load(f) or {}
+        self.extractor = FieldExtractor(rules.get("field_patterns", {}))
+        self.location_fields = list(rules.get("location_relationships", {}) or {})
+        for group, fields in self.extractor.groups:
+            for fld in fields:
+                if group == "person":
+                    short = "person" if fld.name == "name" else fld.name
+                else:
+                    short = group if fld.name == "name" else f"{group}_{fld.name}"
+                self.entity_fields[short] = f"{ENTITIES_FIELD}.{group}.{fld.name}"
+        self.entity_fields["locations"] = f"{ENTITIES_FIELD}.locations"
 
     # --------------------------
     # Mapping and pipeline
     # --------------------------
     def ensure_index(self) -> None:
-        """Create or update a minimal mapping. Add rank_features if we expect ML tokens."""
+        """Create or update the mapping from the configured profile. Add rank_features if we expect ML tokens."""
         props: Dict[str, Any] = {
             self.description_col: {"type": "text"},
             "timestamp": {"type": "date", "ignore_malformed": True},
         }
+        # Optional type-ahead subfield; new subfields can be added to an existing mapping
+        if self.typeahead == "search_as_you_type":
+            props[self.description_col]["fields"] = {
+                TYPEAHEAD_SUBFIELD: {"type": "search_as_you_type"}
+            }
+        elif self.typeahead == "index_prefixes":
+            props[self.description_col]["fields"] = {
+                TYPEAHEAD_SUBFIELD: {"type": "text", "index_prefixes": {"min_chars": 1, "max_chars": 10}}
+            }
+        # Declared filter columns: exact-match/range types instead of dynamic text + keyword
+        for col, typ in self.filter_fields.items():
+            if col == self.description_col:
+                continue
+            props[col] = {"type": typ}
+            if typ not in ("keyword", "boolean"):
+                props[col]["ignore_malformed"] = True
+        # Display-only columns: kept in _source, no inverted index or doc values
+        for col in self.display_fields:
+            if col != self.description_col and col not in self.filter_fields:
+                props[col] = {"type": "keyword", "index": False, "doc_values": False}
+        if self.dedup == "collapse":
+            props["duplicate_count"] = {"type": "integer"}
+        if self.extractor is not None:
+            entities: Dict[str, Any] = {}
+            for path in self.entity_fields.values():
+                parts = path.split(".")[1:]
+                node = entities
+                for part in parts[:-1]:
+                    node = node.setdefault(part, {"properties": {}})["properties"]
+                node[parts[-1]] = {"type": "keyword"}
+            props[ENTITIES_FIELD] = {"properties": entities}
         # It is safe to declare the token field even if it won’t be used.
         props.setdefault("ml", {"properties": {}})
         props["ml"]["properties"]["description_tokens"] = {"type": "rank_features"}
+        if self.chunking:
+            props["ml"]["properties"]["passages"] = {
+                "type": "nested",
+                "properties": {
+                    "tokens": {"type": "rank_features"},
+                    "offset": {"type": "integer", "index": False},
+                },
+            }
 
-        body = {"mappings": {"properties": props}}
-        if self.es.indices.exists(index=self.index_name):
-            self.es.indices.put_mapping(index=self.index_name, properties=props)
+        body: Dict[str, Any] = {"mappings": {"dynamic": self.dynamic, "properties": props}}
+        if self.sort_by_timestamp:
+            # Index sorting can only be set at creation; lets filtered/sorted queries terminate early
+            body["settings"] = {"index": {"sort.field": "timestamp", "sort.order": "desc"}}
+        if self.partition:
+            if self._is_concrete_index():
+                raise ValueError(
+                    f"'{self.index_name}' is an existing non-partitioned index, but partition='monthly' needs that "
+                    f"name for the alias over its partitions. Recreate it (--reindex), or migrate it: export it "
+                    f"without --partition, then restore with --partition monthly --reindex."
+                )
+            # Partitions are auto-created on first write from this template and join the alias
+            self.es.indices.put_index_template(
+                name=f"{self.index_name}-partitions",
+                index_patterns=[f"{self.index_name}-*"],
+                template={**body, "aliases": {self.index_name: {}}},
+                priority=100,
+            )
+            if self.es.indices.exists(index=self.index_name):
+                self.es.indices.put_mapping(index=self.index_name, dynamic=self.dynamic, properties=props)
+        elif self.es.indices.exists(index=self.index_name):
+            self.es.indices.put_mapping(index=self.index_name, dynamic=self.dynamic, properties=props)
         else:
             self.es.indices.create(index=self.index_name, **body)
 
+    def _is_concrete_index(self) -> bool:
+        """True when `index_name` is a regular index rather than the partitions' alias."""
+        return bool(self.es.indices.exists(index=self.index_name)) and not self.es.indices.exists_alias(
+            name=self.index_name
+        )
+
+    def drop_index(self) -> None:
+        """
+        Delete the index. In partitioned mode: every partition behind the alias (which goes
+        with them), a non-partitioned index of the same name, and the partition template.
+        Names are always explicit: clusters refuse wildcard deletes by default
+        (action.destructive_requires_name), and a wildcard would also match unrelated indices.
+        """
+        if not self.partition:
+            self.es.indices.delete(index=self.index_name, ignore_unavailable=True, allow_no_indices=True)
+            return
+        names = self.list_partitions()
+        if self._is_concrete_index():
+            names.append(self.index_name)
+        if names:
+            self.es.indices.delete(index=",".join(names), ignore_unavailable=True)
+        self.es.options(ignore_status=404).indices.delete_index_template(name=f"{self.index_name}-partitions")
+
+    # --------------------------
+    # Time partitions
+    # --------------------------
+    def _partition_for(self, iso_ts: Optional[str]) -> str:
+        if not self.partition:
+            return self.index_name
+        if not iso_ts:
+            return f"{self.index_name}-{UNDATED_PARTITION}"
+        # Route by the UTC month, the same calendar _search_target prunes with
+        try:
+            ts = datetime.fromisoformat(iso_ts)
+        except ValueError:
+            try:
+                ts = dtparser.parse(iso_ts)
+            except (ValueError, OverflowError):
+                return f"{self.index_name}-{UNDATED_PARTITION}"
+        ts = _as_utc(ts)
+        return f"{self.index_name}-{ts.year:04d}.{ts.month:02d}"
+
+    def _search_target(self, filters: Optional[Dict[str, Any]]) -> str:
+        """Comma-separated partitions overlapping a timestamp range filter, else the index/alias."""
+        rng = (filters or {}).get("timestamp")
+        if not self.partition or not isinstance(rng, dict):
+            return self.index_name
+        try:
+            lo = rng.get("gte", rng.get("gt"))
+            hi = rng.get("lte", rng.get("lt"))
+            start = _as_utc(dtparser.parse(str(lo))) if lo is not None else None
+            end = _as_utc(dtparser.parse(str(hi))) if hi is not None else None
+        except (ValueError, OverflowError):
+            return self.index_name  # e.g. date math like now-30d
+        if start is None or end is None:
+            return self.index_name
+        if "lte" not in rng and end.day == 1 and end.time() == datetime.min.time():
+            # exclusive upper bound on a month boundary: that month holds no matches
+            end = end - pd.Timedelta(days=1)
+        names: List[str] = []
+        y, m = start.year, start.month
+        while (y, m) <= (end.year, end.month):
+            names.append(f"{self.index_name}-{y:04d}.{m:02d}")
+            if len(names) > MAX_ROUTED_PARTITIONS:
+                return self.index_name
+            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+        return ",".join(names) if names else self.index_name
+
+    def list_partitions(self) -> List[str]:
+        if not self.partition:
+            return []
+        res = self.es.indices.get(index=f"{self.index_name}-*", allow_no_indices=True, ignore_unavailable=True)
+        # Only <index>-YYYY.MM / <index>-undated: other indices sharing the prefix are not ours
+        prefix = f"{self.index_name}-"
+        return sorted(n for n in res.body.keys() if PARTITION_SUFFIX_RE.match(n[len(prefix):]))
+
+    def drop_partitions_before(self, cutoff: Union[str, datetime]) -> List[str]:
+        """Retention: delete whole monthly partitions that end before `cutoff`. Returns the dropped names."""
+        if not self.partition:
+            raise ValueError("drop_partitions_before() requires partition='monthly'.")
+        cut = _as_utc(cutoff if isinstance(cutoff, datetime) else dtparser.parse(str(cutoff)))
+        cut_key = f"{cut.year:04d}.{cut.month:02d}"
+        prefix = f"{self.index_name}-"
+        doomed = [
+            name for name in self.list_partitions()
+            if name[len(prefix):] != UNDATED_PARTITION and name[len(prefix):] < cut_key
+        ]
+        if doomed:
+            self.es.indices.delete(index=",".join(doomed))
+        return doomed
+
+    def _declared_fields(self) -> List[str]:
+        extra = ["duplicate_count"] if self.dedup == "collapse" else []
+        if self.extractor is not None:
+            extra.append(ENTITIES_FIELD)
+        return [self.description_col, "timestamp", "ml", *extra, *self.filter_fields, *self.display_fields]
+
+    def index_stats(self) -> Dict[str, Any]:
+        """Size and mapping footprint of the index, for comparing mapping profiles."""
+        stats = self.es.indices.stats(index=self.index_name, metric=["docs", "store"])
+        total = stats["_all"]["primaries"]
+        mapping = self.es.indices.get_mapping(index=self.index_name)
+
+        def count_fields(props: Dict[str, Any]) -> int:
+            n = 0
+            for spec in props.values():
+                n += 1
+                n += count_fields(spec.get("properties", {}))
+                n += count_fields(spec.get("fields", {}))
+            return n
+
+        mapped = sum(
+            count_fields(m.get("mappings", {}).get("properties", {})) for m in mapping.body.values()
+        )
+        return {
+            "docs": total["docs"]["count"],
+            "store_bytes": total["store"]["size_in_bytes"],
+            "mapped_fields": mapped,
+            "dynamic": self.dynamic,
+            **self.last_ingest_stats,
+        }
+
     def ensure_pipeline(self) -> None:
         """
         Create or update ingest pipeline that writes to ml.description_tokens.
@@ -139,43 +636,217 @@ class BertDescriptionElser:
             )
         return df
 
-    def _iter_actions(self, df: pd.DataFrame, id_field: Optional[str]) -> Iterable[Dict[str, Any]]:
-        for _, row in df.iterrows():
-            doc: Dict[str, Any] = {}
-            for c in df.columns:
-                val = row[c]
-                if pd.isna(val):
-                    continue
-                doc[c] = val
-
-            # Optional timestamp detection
-            for cand in ("created_dttm", "created_at", "timestamp", "time", "date"):
-                if cand in df.columns and not pd.isna(row.get(cand)):
-                    iso = to_iso(row[cand])
-                    if iso:
-                        doc["timestamp"] = iso
-                        break
-
-            action = {
-                "_op_type": "index",
-                "_index": self.index_name,
-                "_source": doc,
-            }
-            if self.use_ml_requested:
-                action["pipeline"] = self.pipeline_id  # safe; errors surface at bulk time
-            if id_field and id_field in row and pd.notna(row[id_field]):
-                action["_id"] = str(row[id_field])
+    def _infer_sparse(self, texts: Sequence[str]) -> List[Dict[str, float]]:
+        """
+        Client-side ELSER inference: one token->weight map per text, `infer_batch_size`
+        texts per call to the deployed model. Calls are spread over `ingest_threads` workers.
+        """
+        batches = [texts[i:i + self.infer_batch_size] for i in range(0, len(texts), self.infer_batch_size)]
+
+        def run(batch: Sequence[str]) -> List[Dict[str, float]]:
+            res = self.es.ml.infer_trained_model(
+                model_id=self.model_id,
+                docs=[{"text_field": t} for t in batch],
+                timeout="60s",
+            )
+            results = res["inference_results"]
+            with self._infer_lock:
+                self._infer_counters["inference_requests"] += 1
+                self._infer_counters["truncated_inputs"] += sum(1 for r in results if r.get("is_truncated"))
+            return [r.get("predicted_value") or {} for r in results]
+
+        out: List[Dict[str, float]] = []
+        if self.ingest_threads > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=self.ingest_threads) as pool:
+                for part in pool.map(run, batches):  # map keeps input order
+                    out.extend(part)
+        else:
+            for batch in batches:
+                out.extend(run(batch))
+        return out
+
+    def _split_passages(self, text: str) -> List[Tuple[int, str]]:
+        """Overlapping word windows as (word offset, passage text)."""
+        words = text.split()
+        if len(words) <= self.passage_words:
+            return [(0, text)]
+        step = self.passage_words - self.passage_overlap
+        out: List[Tuple[int, str]] = []
+        for start in range(0, len(words), step):
+            out.append((start, " ".join(words[start:start + self.passage_words])))
+            if start + self.passage_words >= len(words):
+                break
+        return out
+
+    def _infer_ml(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        The `ml` sub-document for each text: a single token map, or with chunking one
+        nested entry per passage. All passages go through one flat, evenly batched queue.
+        """
+        if not self.chunking:
+            return [{"description_tokens": t} for t in self._infer_sparse(texts)]
+        per_text = [self._split_passages(t) for t in texts]
+        flat = [p for passages in per_text for _, p in passages]
+        tokens = iter(self._infer_sparse(flat))
+        return [
+            {"passages": [{"offset": offset, "tokens": next(tokens)} for offset, _ in passages]}
+            for passages in per_text
+        ]
+
+    def _apply_dedup(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+        """
+        Group duplicates ahead of inference. Returns the frame to index, optional per-row
+        `ml` sub-documents (reuse mode; rows then bypass the ingest pipeline) and stats.
+        """
+        reps, st = group_near_duplicates(df[self.description_col].tolist(), threshold=self.dedup_threshold)
+        stats: Dict[str, Any] = {"dedup": self.dedup, **st}
+        avoided = st["rows"] - st["groups"]
+
+        if self.dedup == "collapse":
+            counts = Counter(reps)
+            keep = [pos for pos, rep in enumerate(reps) if rep == pos]
+            df = df.iloc[keep].copy()
+            df["duplicate_count"] = [counts[pos] for pos in keep]
+            stats["inference_calls_avoided"] = avoided if self.use_ml_requested else 0
+            return df, None, stats
+
+        # reuse: infer representatives only, then fan their token maps out
+        if not self.use_ml_requested:
+            stats["inference_calls_avoided"] = 0
+            return df, None, stats
+        rep_positions = sorted(set(reps))
+        texts = df[self.description_col].tolist()
+        try:
+            rep_ml = self._infer_ml([texts[pos] for pos in rep_positions])
+        except ApiError as e:
+            # Model not deployed/licensed: leave inference to the ingest pipeline
+            stats.update({"inference_calls_avoided": 0, "dedup_fallback": str(e)})
+            return df, None, stats
+        by_rep = dict(zip(rep_positions, rep_ml))
+        stats["inference_calls_avoided"] = avoided
+        return df, [by_rep[rep] for rep in reps], stats
+
+    def _entity_doc(self, text: str) -> Dict[str, Any]:
+        """Regex-extracted fields for one description, plus every location value in `locations`."""
+        fields = self.extractor.extract(text)
+        doc: Dict[str, Any] = {group: values for group, values in fields.items() if values}
+        locations = [v for k, v in fields.get("person", {}).items() if k in self.location_fields]
+        if locations:
+            doc["locations"] = list(dict.fromkeys(locations))
+        return doc
+
+    def _iter_actions(
+        self,
+        df: pd.DataFrame,
+        id_field: Optional[str],
+        ml_docs: Optional[List[Dict[str, Any]]] = None,
+    ) -> Iterable[Dict[str, Any]]:
+        for pos, (_, row) in enumerate(df.iterrows()):
+            with span("_iter_actions"):  # one span per document, closed before the bulk helper resumes us
+                doc: Dict[str, Any] = {}
+                for c in df.columns:
+                    val = row[c]
+                    if pd.isna(val):
+                        continue
+                    doc[c] = val
+
+                # Optional timestamp detection
+                for cand in ("created_dttm", "created_at", "timestamp", "time", "date"):
+                    if cand in df.columns and not pd.isna(row.get(cand)):
+                        iso = to_iso(row[cand])
+                        if iso:
+                            doc["timestamp"] = iso
+                            break
+
+                if self.extractor is not None:
+                    entities = self._entity_doc(str(doc.get(self.description_col, "")))
+                    if entities:
+                        doc[ENTITIES_FIELD] = entities
+
+                if ml_docs is not None:
+                    # Tokens computed client-side (shared across duplicates / per passage); skip the pipeline
+                    doc["ml"] = ml_docs[pos]
+
+                action = {
+                    "_op_type": "index",
+                    "_index": self._partition_for(doc.get("timestamp")),
+                    "_source": doc,
+                }
+                if self.use_ml_requested and ml_docs is None:
+                    action["pipeline"] = self.pipeline_id  # safe; errors surface at bulk time
+                if id_field and id_field in row and pd.notna(row[id_field]):
+                    action["_id"] = str(row[id_field])
             yield action
 
-    def bulk_index_dataframe(self, df: pd.DataFrame, id_field: Optional[str] = None, chunk_size: int = 500) -> None:
+    def bulk_index_dataframe(
+        self,
+        df: pd.DataFrame,
+        id_field: Optional[str] = None,
+        chunk_size: int = 500,
+        refresh: bool = True,
+    ) -> None:
+        """
+        Index one DataFrame. `refresh=False` leaves the refresh to the caller, for callers
+        that stream a file in several DataFrames and refresh once at the end.
+        """
         df = self._sanitize_dataframe(df)
+        if self.dynamic == "strict":
+            # Fail before sending anything rather than on every document at bulk time
+            undeclared = [c for c in df.columns if c not in self._declared_fields()]
+            if undeclared:
+                raise ValueError(
+                    f"dynamic='strict' rejects undeclared columns {undeclared}. "
+                    f"Declare them as filter or display fields, or drop them."
+                )
+        t0 = time.perf_counter()
+        ml_docs: Optional[List[Dict[str, Any]]] = None
+        dedup_stats: Dict[str, Any] = {}
+        self._infer_counters = {"inference_requests": 0, "truncated_inputs": 0}
+        if self.dedup:
+            df, ml_docs, dedup_stats = self._apply_dedup(df)
+        if self.chunking and self.use_ml_requested and ml_docs is None and not dedup_stats.get("dedup_fallback"):
+            # The ingest pipeline cannot split passages, so chunking infers client-side
+            try:
+                ml_docs = self._infer_ml(df[self.description_col].tolist())
+            except ApiError as e:
+                dedup_stats["chunking_fallback"] = str(e)
+        if self.chunking and (dedup_stats.get("chunking_fallback") or dedup_stats.get("dedup_fallback")):
+            self.passages_fallback = True
+        self._run_bulk(self._iter_actions(df, id_field, ml_docs), chunk_size, refresh)
+        elapsed = time.perf_counter() - t0
+        self.last_ingest_stats = {
+            "indexed_rows": len(df),
+            "ingest_seconds": round(elapsed, 3),
+            "docs_per_sec": round(len(df) / elapsed, 1) if elapsed > 0 else None,
+            **dedup_stats,
+            **self._infer_counters,
+        }
+
+    def _run_bulk(self, actions: Iterable[Dict[str, Any]], chunk_size: int, refresh: bool) -> None:
         try:
-            helpers.bulk(
-                self.es,
-                self._iter_actions(df, id_field),
-                chunk_size=chunk_size,
-                refresh="wait_for",
-            )
+            if self.ingest_threads > 1:
+                # parallel_bulk is lazy and yields per-document results; raise like helpers.bulk
+                errors: List[Dict[str, Any]] = []
+                for ok, item in helpers.parallel_bulk(
+                    self.es,
+                    actions,
+                    thread_count=self.ingest_threads,
+                    chunk_size=chunk_size,
+                    raise_on_error=False,
+                ):
+                    if not ok:
+                        errors.append(item)
+                if errors:
+                    raise BulkIndexError(f"{len(errors)} document(s) failed to index.", errors)
+                if refresh:
+                    self.es.indices.refresh(index=self.index_name)
+            else:
+                helpers.bulk(
+                    self.es,
+                    actions,
+                    chunk_size=chunk_size,
+                    refresh="wait_for" if refresh else False,
+                )
         except BulkIndexError as bie:
             errors = getattr(bie, "errors", [])
             preview = errors[:3]
@@ -184,40 +855,203 @@ class BertDescriptionElser:
             ) from bie
 
     def bulk_index_file(self, csv_or_xlsx: Union[str, Path], id_field: Optional[str] = None) -> None:
-        p = Path(csv_or_xlsx)
-        if not p.exists():
-            raise FileNotFoundError(p)
-        if p.suffix.lower() == ".csv":
-            df = pd.read_csv(p)
-        elif p.suffix.lower() in (".xlsx", ".xls"):
-            # openpyxl engine required for some environments
-            df = pd.read_excel(p, engine="openpyxl")
-        else:
-            raise ValueError("Only .csv, .xlsx, or .xls are supported")
-        self.bulk_index_dataframe(df, id_field=id_field)
+        self.bulk_index_dataframe(read_table(csv_or_xlsx), id_field=id_field)
+
+    # --------------------------
+    # Snapshots
+    # --------------------------
+    def export_index(
+        self,
+        path: Union[str, Path],
+        slices: Optional[int] = None,
+        page_size: int = 1000,
+        keep_alive: str = "5m",
+    ) -> Dict[str, Any]:
+        """
+        Dump every document (`_id` and full `_source`, including `ml.description_tokens` and
+        passages) to `path` (.ndjson.gz, .jsonl.gz, .ndjson or .parquet). One point in time
+        is split into `slices` (default: `ingest_threads`) read in parallel with search_after,
+        so the dump is consistent and needs no scroll contexts. Returns counts and timings.
+        """
+        slices = max(1, int(slices or self.ingest_threads))
+        t0 = time.perf_counter()
+        out = SnapshotWriter(path)  # before the PIT, so a bad suffix or missing pyarrow leaves nothing open
+        counts = [0] * slices
+
+        def read_slice(pit: str, i: int) -> None:
+            pit_id = pit
+            search_after = None
+            while True:
+                body: Dict[str, Any] = {
+                    "size": page_size,
+                    "pit": {"id": pit_id, "keep_alive": keep_alive},
+                    "sort": ["_shard_doc"],
+                    "track_total_hits": False,
+                }
+                if slices > 1:
+                    body["slice"] = {"id": i, "max": slices}
+                if search_after is not None:
+                    body["search_after"] = search_after
+                with span("es.search", kind="export", slice=i):
+                    res = self.es.search(body=body)
+                hits = res["hits"]["hits"]
+                if not hits:
+                    return
+                pit_id = res.get("pit_id", pit_id)
+                out.write([(h["_id"], h.get("_source", {})) for h in hits])
+                counts[i] += len(hits)
+                search_after = hits[-1]["sort"]
+
+        with out:
+            pit = self.es.open_point_in_time(index=self.index_name, keep_alive=keep_alive)["id"]
+            try:
+                with ThreadPoolExecutor(max_workers=slices) as pool:
+                    for f in [pool.submit(read_slice, pit, i) for i in range(slices)]:
+                        f.result()
+            finally:
+                self.es.close_point_in_time(id=pit)
+        elapsed = time.perf_counter() - t0
+        docs = sum(counts)
+        return {
+            "docs": docs,
+            "slices": slices,
+            "format": snapshot_format(path),
+            "bytes": Path(path).stat().st_size,
+            "seconds": round(elapsed, 3),
+            "docs_per_sec": round(docs / elapsed, 1) if elapsed > 0 else None,
+        }
+
+    def restore_index(self, path: Union[str, Path], chunk_size: int = 500) -> None:
+        """
+        Bulk-load a snapshot from export_index(). Documents keep their `_id` and `ml` tokens and
+        bypass the ingest pipeline, so nothing is re-inferred. The index is created from this
+        instance's mapping profile (configure it like the exporting side); partitioned
+        layouts route each document by its stored timestamp. Stats go to `last_ingest_stats`.
+        """
+        snapshot_format(path)  # fail on an unknown suffix before touching the index
+        if not Path(path).exists():
+            raise FileNotFoundError(path)
+        self.ensure_index()
+        t0 = time.perf_counter()
+        restored = [0]
+
+        def actions() -> Iterator[Dict[str, Any]]:
+            for doc_id, src in iter_snapshot(path):
+                restored[0] += 1
+                # No "pipeline": tokens are already in the source
+                yield {
+                    "_op_type": "index",
+                    "_index": self._partition_for(src.get("timestamp")),
+                    "_id": doc_id,
+                    "_source": src,
+                }
+
+        self._run_bulk(actions(), chunk_size, refresh=True)
+        elapsed = time.perf_counter() - t0
+        self.last_ingest_stats = {
+            "indexed_rows": restored[0],
+            "ingest_seconds": round(elapsed, 3),
+            "docs_per_sec": round(restored[0] / elapsed, 1) if elapsed > 0 else None,
+            "restored_from": str(path),
+            "inference_requests": 0,
+        }
 
     # --------------------------
     # Search
     # --------------------------
-    def _build_body(self, question: str, size: int, include_elser: bool, fields_to_return: Optional[Sequence[str]]) -> Dict[str, Any]:
+    def _resolve_field(self, col: str) -> str:
+        """Entity short names (`flight_number`, `locations`, ...) -> their `entities.*` field path."""
+        return self.entity_fields.get(col, col)
+
+    def _filter_target(self, col: str, value: Any) -> str:
+        """Field to run exact matches against: dynamic string columns keep their value in `.keyword`."""
+        if col in self.filter_fields or col == "timestamp" or not isinstance(value, str):
+            return col
+        if col.startswith(f"{ENTITIES_FIELD}.") and self.extractor is not None:
+            return col
+        return f"{col}.keyword" if self.dynamic is True else col
+
+    def _build_filters(self, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Translate structured filters into non-scoring bool.filter clauses (cached by ES):
+          {"timestamp": {"gte": "2024-01-01", "lt": "2024-02-01"}}  -> range
+          {"country": "KE"}                                       -> term
+          {"status": ["open", "closed"]}                          -> terms
+          {"_exists": ["passport_number"]}                        -> exists
+        Entity short names resolve to their keyword fields: {"flight_number": ["ET345"]}.
+        """
+        clauses: List[Dict[str, Any]] = []
+        for col, value in (filters or {}).items():
+            if value is None:
+                continue
+            col = self._resolve_field(col)
+            if col == "_exists":
+                names = [value] if isinstance(value, str) else list(value)
+                clauses.extend({"exists": {"field": self._resolve_field(name)}} for name in names)
+            elif isinstance(value, dict):
+                clauses.append({"range": {col: value}})
+            elif isinstance(value, (list, tuple, set)):
+                values = list(value)
+                if values:
+                    clauses.append({"terms": {self._filter_target(col, values[0]): values}})
+            else:
+                clauses.append({"term": {self._filter_target(col, value): value}})
+        return clauses
+
+    def _build_body(
+        self,
+        question: str,
+        size: int,
+        include_elser: bool,
+        fields_to_return: Optional[Sequence[str]],
+        filters: Optional[Dict[str, Any]] = None,
+        newest_first: bool = False,
+    ) -> Dict[str, Any]:
         should: List[Dict[str, Any]] = []
         # BM25 always present
         should.append({"match": {self.description_col: {"query": question, "boost": 0.6}}})
         # ELSER if requested
         if include_elser and self.use_ml_requested:
-            should.append({
-                "text_expansion": {
-                    "ml.description_tokens": {
-                        "model_id": self.model_id,
-                        "model_text": question,
+            if self.chunking:
+                # Max-passage scoring: a document is as relevant as its best passage
+                should.append({
+                    "nested": {
+                        "path": "ml.passages",
+                        "score_mode": "max",
+                        "query": {
+                            "text_expansion": {
+                                "ml.passages.tokens": {
+                                    "model_id": self.model_id,
+                                    "model_text": question,
+                                }
+                            }
+                        },
                     }
-                }
-            })
+                })
+            if not self.chunking or self.passages_fallback:
+                should.append({
+                    "text_expansion": {
+                        "ml.description_tokens": {
+                            "model_id": self.model_id,
+                            "model_text": question,
+                        }
+                    }
+                })
 
+        bool_q: Dict[str, Any] = {"should": should, "minimum_should_match": 1}
+        filter_clauses = self._build_filters(filters)
+        if filter_clauses:
+            bool_q["filter"] = filter_clauses
         body: Dict[str, Any] = {
             "size": size,
-            "query": {"bool": {"should": should, "minimum_should_match": 1}},
+            "query": {"bool": bool_q},
         }
+        if filter_clauses or newest_first:
+            # Exact totals force visiting every match; skipping them lets ES stop early
+            body["track_total_hits"] = False
+        if newest_first:
+            # On an index sorted by timestamp (sort_by_timestamp=True) this terminates early per segment
+            body["sort"] = [{"timestamp": {"order": "desc", "missing": "_last"}}]
         if fields_to_return:
             body["_source"] = list(fields_to_return)
         return body
@@ -228,20 +1062,138 @@ class BertDescriptionElser:
         size: int = 10,
         hybrid: bool = True,
         fields_to_return: Optional[Sequence[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        newest_first: bool = False,
+        with_graph: bool = False,
     ) -> pd.DataFrame:
+        """
+        Hybrid (ELSER + BM25) or BM25-only search. `filters` restrict hits in filter
+        context (see `_build_filters`) so `size` applies after filtering; `newest_first`
+        orders matches by timestamp instead of relevance. `with_graph` adds `record_id`
+        and `graph` (linked persons, organizations, locations) from the graph context.
+        """
         if not _coerce_str(question):
             raise ValueError("Provide a non-empty search question.")
+        if with_graph:
+            if self.graph_context is None:
+                raise ValueError("with_graph needs a graph_context.")
+            if fields_to_return:
+                # The join needs the description (and the record key column, when configured)
+                key = getattr(self.graph_context, "key_column", None)
+                extra = [c for c in (self.description_col, key) if c and c not in fields_to_return]
+                fields_to_return = [*fields_to_return, *extra]
+
+        # Partitioned layout: only search months overlapping the timestamp filter
+        target = self._search_target(filters)
 
         # Try ELSER + BM25 first; on API error, retry BM25-only
-        try:
-            body = self._build_body(question, size, include_elser=hybrid, fields_to_return=fields_to_return)
-            res = self.es.search(index=self.index_name, body=body)
-        except ApiError:
-            body = self._build_body(question, size, include_elser=False, fields_to_return=fields_to_return)
-            res = self.es.search(index=self.index_name, body=body)
+        with span("es.search", kind="search", hybrid=hybrid):
+            try:
+                body = self._build_body(question, size, include_elser=hybrid, fields_to_return=fields_to_return,
+                                        filters=filters, newest_first=newest_first)
+                res = self.es.search(index=target, body=body, ignore_unavailable=True, allow_no_indices=True)
+            except ApiError:
+                body = self._build_body(question, size, include_elser=False, fields_to_return=fields_to_return,
+                                        filters=filters, newest_first=newest_first)
+                res = self.es.search(index=target, body=body, ignore_unavailable=True, allow_no_indices=True)
 
         rows: List[Dict[str, Any]] = []
         for h in res.get("hits", {}).get("hits", []):
             src = h.get("_source", {})
             rows.append({"_score": h.get("_score", 0.0), **src})
+        hits = pd.DataFrame(rows)
+        if with_graph:
+            with span("graph_context.enrich", hits=len(hits)):
+                hits = self.graph_context.enrich(hits, self.description_col)
+        return hits
+
+    def facets(
+        self,
+        question: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        size: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        hybrid: bool = True,
+        sample_size: Optional[int] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Most frequent values of extracted entity fields, in one round trip: a size-0 search
+        (the same query and filters as `semantic_search`, or every document without a question)
+        with one terms aggregation per field. `sample_size` restricts the counts to the best
+        scoring documents per shard (sampler aggregation) instead of every match.
+        Returns {field: [{"value": ..., "count": ...}, ...]}.
+        """
+        if self.extractor is None:
+            raise ValueError("Facets need entity extraction: create the pipeline with entity_rules=...")
+        names = list(fields or self.entity_fields)
+        aggs: Dict[str, Any] = {
+            name: {"terms": {"field": self._resolve_field(name), "size": size}} for name in names
+        }
+        if sample_size:
+            aggs = {"sample": {"sampler": {"shard_size": sample_size}, "aggs": aggs}}
+
+        def body(include_elser: bool) -> Dict[str, Any]:
+            if _coerce_str(question):
+                b = self._build_body(question, 0, include_elser=include_elser, fields_to_return=None, filters=filters)
+            else:
+                b = {"size": 0, "query": {"bool": {"filter": self._build_filters(filters)}}, "track_total_hits": False}
+            b["aggs"] = aggs
+            return b
+
+        target = self._search_target(filters)
+        with span("es.search", kind="facets", hybrid=hybrid):
+            try:
+                res = self.es.search(index=target, body=body(hybrid), ignore_unavailable=True, allow_no_indices=True)
+            except ApiError:
+                res = self.es.search(index=target, body=body(False), ignore_unavailable=True, allow_no_indices=True)
+
+        result = res.get("aggregations", {})
+        if sample_size:
+            result = result.get("sample", {})
+        return {
+            name: [{"value": b["key"], "count": b["doc_count"]} for b in result.get(name, {}).get("buckets", [])]
+            for name in names
+        }
+
+    def _build_suggest_body(self, prefix: str, size: int) -> Dict[str, Any]:
+        if self.typeahead == "search_as_you_type":
+            sub = f"{self.description_col}.{TYPEAHEAD_SUBFIELD}"
+            query: Dict[str, Any] = {
+                "multi_match": {
+                    "query": prefix,
+                    "type": "bool_prefix",
+                    "fields": [sub, f"{sub}._2gram", f"{sub}._3gram"],
+                }
+            }
+        else:
+            # index_prefixes: the trailing term is answered from the prefix index.
+            # Without a typeahead subfield this still works, just as a costlier term expansion.
+            field = (
+                f"{self.description_col}.{TYPEAHEAD_SUBFIELD}"
+                if self.typeahead == "index_prefixes" else self.description_col
+            )
+            query = {"match_bool_prefix": {field: {"query": prefix}}}
+        return {
+            "size": size,
+            "query": query,
+            "_source": [self.description_col],
+            "track_total_hits": False,
+        }
+
+    def suggest(self, prefix: str, size: int = 5) -> pd.DataFrame:
+        """
+        Cheap type-ahead lookup for a partial query. Lexical only: never calls ELSER,
+        so it is safe to run on every keystroke.
+        """
+        if not _coerce_str(prefix):
+            return pd.DataFrame(columns=["_score", self.description_col])
+        with span("es.search", kind="suggest"):
+            res = self.es.search(
+                index=self.index_name,
+                body=self._build_suggest_body(prefix.strip(), size),
+                request_cache=True,
+            )
+        rows: List[Dict[str, Any]] = []
+        for h in res.get("hits", {}).get("hits", []):
+            rows.append({"_score": h.get("_score", 0.0), **h.get("_source", {})})
         return pd.DataFrame(rows)
@@ -0,0 +1,143 @@
+"""
+dedup.py
+Near-duplicate grouping of description texts, used before ELSER inference.
+
+Two stages:
+- Exact: texts that are equal after normalization (case, whitespace, punctuation) collapse.
+- Near: MinHash signatures over word shingles, bucketed with LSH banding; candidate pairs
+  are kept when their estimated Jaccard similarity reaches `threshold`.
+
+Each input row is mapped to the position of its group representative (the first row
+seen in that group), so callers can infer once per representative and fan results out.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_PUNCT = re.compile(r"[^\w\s]+", flags=re.UNICODE)
+_SPACE = re.compile(r"\s+")
+
+_MERSENNE = np.uint64((1 << 31) - 1)
+
+
+def normalize_text(text: str) -> str:
+    """Casefold, drop punctuation and collapse whitespace."""
+    t = _PUNCT.sub(" ", str(text).casefold())
+    return _SPACE.sub(" ", t).strip()
+
+
+def _shingles(norm: str, k: int) -> List[str]:
+    words = norm.split(" ")
+    if len(words) <= k:
+        return [norm]
+    return [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+
+
+class MinHasher:
+    """MinHash signatures with `num_perm` universal hash functions (vectorized with numpy)."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 13) -> None:
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.randint(1, int(_MERSENNE), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE), size=num_perm).astype(np.uint64)
+
+    def signature(self, norm: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) & 0x7FFFFFFF for s in set(_shingles(norm, self.shingle_size))),
+            dtype=np.uint64,
+        )
+        # (a*x + b) mod p stays below 2**63 because a, b < 2**31 and x < 2**31
+        return ((self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE).min(axis=1)
+
+
+def _bands_for(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Pick (bands, rows) with bands*rows == num_perm whose S-curve midpoint is closest to threshold."""
+    best: Optional[Tuple[float, int, int]] = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        midpoint = (1.0 / bands) ** (1.0 / rows)
+        # stay slightly below the threshold so true matches are rarely missed
+        score = abs(midpoint - (threshold - 0.05))
+        if best is None or score < best[0]:
+            best = (score, bands, rows)
+    assert best is not None
+    return best[1], best[2]
+
+
+def group_near_duplicates(
+    texts: Sequence[str],
+    threshold: float = 0.9,
+    num_perm: int = 64,
+    shingle_size: int = 3,
+    near: bool = True,
+) -> Tuple[List[int], Dict[str, int]]:
+    """
+    Returns (representative position for every text, stats).
+    With `near=False` only the exact normalized-hash stage runs.
+    """
+    reps: List[int] = [0] * len(texts)
+    exact: Dict[bytes, int] = {}  # normalized-text digest -> representative
+    hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size) if near else None
+    bands, rows = _bands_for(num_perm, threshold) if near else (0, 0)
+    buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+    signatures: Dict[int, np.ndarray] = {}
+    n_exact = n_near = 0
+
+    for pos, text in enumerate(texts):
+        norm = normalize_text(text)
+        key = hashlib.blake2b(norm.encode("utf-8"), digest_size=16).digest()
+        if key in exact:
+            reps[pos] = exact[key]
+            n_exact += 1
+            continue
+        if hasher is None:
+            exact[key] = pos
+            reps[pos] = pos
+            continue
+
+        sig = hasher.signature(norm)
+        band_keys = [(b, sig[b * rows:(b + 1) * rows].tobytes()) for b in range(bands)]
+        match: Optional[int] = None
+        seen = set()
+        for bk in band_keys:
+            for cand in buckets.get(bk, ()):
+                if cand in seen:
+                    continue
+                seen.add(cand)
+                if float(np.mean(signatures[cand] == sig)) >= threshold:
+                    match = cand
+                    break
+            if match is not None:
+                break
+
+        if match is not None:
+            reps[pos] = match
+            exact[key] = match
+            n_near += 1
+            continue
+
+        # New representative
+        reps[pos] = pos
+        exact[key] = pos
+        signatures[pos] = sig
+        for bk in band_keys:
+            buckets[bk].append(pos)
+
+    stats = {
+        "rows": len(texts),
+        "groups": len(texts) - n_exact - n_near,
+        "exact_duplicates": n_exact,
+        "near_duplicates": n_near,
+    }
+    return reps, stats
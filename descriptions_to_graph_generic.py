@@ -7,13 +7,17 @@ Input: descriptions_only.xlsx
   - Each row describes ONE person in free text, like:
       NAME: John Doe; DOB: 1980-01-01; Citizenship: ...; ...
 
-Config: relation_rules.yml
+Config: relation_rules.yml (falls back to the rules.yml shared with new.py; GRAPH_RULES=<path> overrides)
   - field_patterns.person / field_patterns.organization: regex patterns
   - location_relationships: mapping of person field -> relationship type
 
+Offline import (first-time loads):
+  python descriptions_to_graph_generic.py --export-import-csv import_csv/
+  python descriptions_to_graph_generic.py --verify-import-csv import_csv/   (after an online load)
+
 Graph model:
 
-  (:Record {record_id, description, row_index, source_file})
+  (:Record {record_id, description, content_hash, row_index, source_file})
   (:Entity:Person {
       name, dob, citizenship, place_of_birth, phone_number,
       address, passport_number, flight_number, ...
@@ -32,10 +36,20 @@ Graph model:
 
 from neo4j import GraphDatabase
 from pathlib import Path
+from contextlib import ExitStack
+from datetime import datetime, timezone
+import argparse
+import csv
+import hashlib
+import os
 import pandas as pd
 import yaml
-import re
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+from entity_cache import EntityCache
+import graph_batch
+from graph_batch import PERSON_FIELDS, BatchWriter, GraphBatch, GraphSchema, PlannedRow, clean_str
+from field_extractor import FieldExtractor
 
 # --- BASIC CONFIG ---
 NEO4J_URI  = "neo4j://localhost:7687"
@@ -43,20 +57,14 @@ NEO4J_USER = "neo4j"
 NEO4J_PASS = "neo4j123"
 
 EXCEL_PATH  = Path("descriptions_only.xlsx")
-RULES_PATH  = Path("relation_rules.yml")
+RULES_PATH  = Path(os.environ.get("GRAPH_RULES") or next(
+    (p for p in ("relation_rules.yml", "rules.yml") if Path(p).exists()), "relation_rules.yml"
+))
 SOURCE_NAME = EXCEL_PATH.name
+DEBUG_RECORDS = False        # print every record's extracted fields
 
 
 # --- HELPERS ---
-def clean_str(v) -> Optional[str]:
-    if v is None:
-        return None
-    if isinstance(v, float) and pd.isna(v):
-        return None
-    s = str(v).strip()
-    return s if s else None
-
-
 def load_rules(path: Path) -> Dict[str, Any]:
     if not path.exists():
         raise FileNotFoundError(f"Missing rules file: {path}")
@@ -66,11 +74,12 @@ def load_rules(path: Path) -> Dict[str, Any]:
 
 rules = load_rules(RULES_PATH)
 
-RECORD_LABEL = rules.get("record", {}).get("label", "Record")
-RECORD_ID_PREFIX = rules.get("record", {}).get("id_prefix", "DESC_")
+SCHEMA = GraphSchema(rules, SOURCE_NAME)
+RECORD_LABEL = SCHEMA.record_label
+RECORD_ID_PREFIX = SCHEMA.id_prefix
 ENTITY_CONFIG = rules.get("entities", {})
 FIELD_PATTERNS = rules.get("field_patterns", {})
-LOCATION_REL_MAP = rules.get("location_relationships", {})
+LOCATION_REL_MAP = SCHEMA.location_rel_map
 
 
 # --- NEO4J DRIVER ---
@@ -116,7 +125,35 @@ def load_descriptions(path: Path) -> pd.DataFrame:
     return df
 
 
+# --- RECORD IDS (incremental loads) ---
+# Stable record ids and unchanged-row skipping, see graph_batch.py.
+RECORD_KEY_COLUMN = SCHEMA.key_column
+FULL_RELOAD = False          # True = re-upsert every row, changed or not
+
+
+def plan_records(df: pd.DataFrame) -> List[PlannedRow]:
+    """Stable record ids and content hashes for every non-empty description (first occurrence wins)."""
+    return graph_batch.plan_records(SCHEMA, df)
+
+
+def existing_hashes(record_ids: List[str]) -> Dict[str, Optional[str]]:
+    return graph_batch.existing_hashes(driver, SCHEMA, record_ids)
+
+
+def skip_unchanged(planned: List[PlannedRow]) -> List[PlannedRow]:
+    if FULL_RELOAD:
+        return planned
+    changed = graph_batch.skip_unchanged(driver, SCHEMA, planned)
+    print(f"{len(planned) - len(changed)} unchanged records skipped, {len(changed)} to load")
+    return changed
+
+
 # --- FIELD EXTRACTION FROM TEXT ---
+# Rules are compiled once; set PROFILE_RULES to time every pattern and print a report.
+PROFILE_RULES = False
+EXTRACTOR = FieldExtractor(FIELD_PATTERNS, profile=PROFILE_RULES)
+
+
 def extract_fields(text: str) -> Dict[str, Dict[str, str]]:
     """
     Apply regex patterns from YAML to a description.
@@ -126,251 +163,294 @@ def extract_fields(text: str) -> Dict[str, Dict[str, str]]:
         "organization": {field -> value, ...}
       }
     """
-    result = {"person": {}, "organization": {}}
-
-    for group_name, group_cfg in FIELD_PATTERNS.items():
-        group_out: Dict[str, str] = {}
-        for field_name, field_cfg in group_cfg.items():
-            patterns: List[str] = field_cfg.get("patterns", [])
-            value_found: Optional[str] = None
-            for pat in patterns:
-                m = re.search(pat, text, flags=re.IGNORECASE)
-                if m:
-                    raw = m.group("value")
-                    val = raw.strip().strip('",; ')
-                    if val:
-                        value_found = val
-                        break
-            if value_found:
-                group_out[field_name] = value_found
-        result[group_name] = group_out
-
-    return result
-
-
-# --- GRAPH UPSERTS ---
-def upsert_record(record_id: str, row_index: int, description: str):
-    params = {
-        "record_id": record_id,
-        "row_index": row_index,
-        "description": description,
-        "source_file": SOURCE_NAME,
-    }
-    cypher = f"""
-    MERGE (r:{RECORD_LABEL} {{record_id: $record_id}})
-    ON CREATE SET
-      r.description = $description,
-      r.row_index   = $row_index,
-      r.source_file = $source_file,
-      r.created_at  = datetime(),
-      r.updated_at  = datetime()
-    ON MATCH SET
-      r.description = $description,
-      r.updated_at  = datetime()
-    """
-    write(cypher, params)
+    return EXTRACTOR.extract(text)
+
+
+def extract_many(texts: List[str]) -> List[Dict[str, Dict[str, str]]]:
+    return EXTRACTOR.extract_many(texts)
+
+
+# --- GRAPH UPSERTS (batched) ---
+# Statements and GraphBatch live in graph_batch.py (shared with new.py).
+BATCH_SIZE = 1000
+
+# Locations and organizations already written in this run are not MERGEd again;
+# repeat sightings only refresh updated_at (see entity_cache.py).
+ENTITY_CACHE_SIZE = 100_000
+ENTITY_CACHE = EntityCache(ENTITY_CACHE_SIZE)
+
+
+def new_batch(cache: Optional[EntityCache] = None) -> GraphBatch:
+    return GraphBatch(SCHEMA, cache if cache is not None else ENTITY_CACHE)
 
 
-def upsert_person(person_fields: Dict[str, str]) -> Optional[str]:
+def touch_cached_entities(cache: Optional[EntityCache] = None) -> int:
+    """End of run: one write refreshing updated_at on every entity whose re-MERGE was skipped."""
+    return graph_batch.touch_cached_entities(driver, cache if cache is not None else ENTITY_CACHE)
+
+
+# --- OFFLINE IMPORT (neo4j-admin CSVs) ---
+# First-time loads of millions of rows go much faster through `neo4j-admin database import`
+# than through Cypher MERGE. The export runs the same extraction and GraphBatch logic as the
+# online load and writes node/relationship CSVs for the same graph model.
+IMPORT_FILES = {
+    "records": "records.csv",
+    "persons": "persons.csv",
+    "organizations": "organizations.csv",
+    "locations": "locations.csv",
+    "describes": "describes.csv",
+    "person_orgs": "person_organization_rels.csv",
+    "person_locations": "person_location_rels.csv",
+}
+
+ENTITY_LABELS = {"PERSON": "Entity;Person", "ORG": "Entity;Organization", "GPE": "Entity;Location"}
+ENTITY_HEADER = [":ID(Entity)", "entity_type", "canonical_text", "name"]
+AUDIT_HEADER = ["source", "created_at:datetime", "updated_at:datetime"]
+REL_HEADER = [":START_ID(Entity)", ":END_ID(Entity)", ":TYPE", "source", "first_seen:datetime", "last_seen:datetime"]
+
+
+def _entity_id(entity_type: str, name: str) -> str:
+    return f"{entity_type}:{name}"
+
+
+def _rel_key(rel_type: str, start: str, end: str) -> bytes:
+    # Short digests keep the relationship de-dup set small on large loads
+    return hashlib.blake2b(f"{rel_type}\0{start}\0{end}".encode("utf-8"), digest_size=8).digest()
+
+
+def export_import_csv(rows: List[PlannedRow], out_dir: Path) -> Dict[str, int]:
     """
-    Create/merge a Person entity node based on extracted fields.
-    Returns the person name (used as canonical_text) or None.
+    Extract `rows` and write neo4j-admin import CSVs into `out_dir`; returns row counts per file.
+
+    Records, locations and relationships are streamed to disk batch by batch. Persons and
+    organizations are kept (one entry per distinct entity) until the end, because a later
+    row may fill a property the first one lacked, as ON MATCH coalesce does online.
+    Relationships are de-duplicated like MERGE.
     """
-    name = clean_str(person_fields.get("name"))
-    if not name:
-        return None
-
-    # Map fields to properties
-    params = {
-        "name": name,
-        "dob": clean_str(person_fields.get("dob")),
-        "citizenship": clean_str(person_fields.get("citizenship")),
-        "place_of_birth": clean_str(person_fields.get("place_of_birth")),
-        "phone_number": clean_str(person_fields.get("phone_number")),
-        "address": clean_str(person_fields.get("address")),
-        "passport_number": clean_str(person_fields.get("passport_number")),
-        "flight_number": clean_str(person_fields.get("flight_number")),
-        "departure_location": clean_str(person_fields.get("departure_location")),
-        "arrival_location": clean_str(person_fields.get("arrival_location")),
-        "arrest_location": clean_str(person_fields.get("arrest_location")),
-        "arrival_date": clean_str(person_fields.get("arrival_date")),
-        "departure_date": clean_str(person_fields.get("departure_date")),
-        "date_generic": clean_str(person_fields.get("date_generic")),
-        "money": clean_str(person_fields.get("money")),
-        "license_plate": clean_str(person_fields.get("license_plate")),
-        "drivers_license": clean_str(person_fields.get("drivers_license")),
-    }
-
-    # Ensure Person has :Entity:Person labels and uses entity_type='PERSON'
-    cypher = """
-    MERGE (p:Entity:Person {entity_type: 'PERSON', canonical_text: $name})
-    ON CREATE SET
-      p.name             = $name,
-      p.dob              = $dob,
-      p.citizenship      = $citizenship,
-      p.place_of_birth   = $place_of_birth,
-      p.phone_number     = $phone_number,
-      p.address          = $address,
-      p.passport_number  = $passport_number,
-      p.flight_number    = $flight_number,
-      p.departure_location = $departure_location,
-      p.arrival_location   = $arrival_location,
-      p.arrest_location    = $arrest_location,
-      p.arrival_date     = $arrival_date,
-      p.departure_date   = $departure_date,
-      p.date_generic     = $date_generic,
-      p.money            = $money,
-      p.license_plate    = $license_plate,
-      p.drivers_license  = $drivers_license,
-      p.source           = 'structured_text',
-      p.created_at       = datetime(),
-      p.updated_at       = datetime()
-    ON MATCH SET
-      p.dob              = coalesce(p.dob, $dob),
-      p.citizenship      = coalesce(p.citizenship, $citizenship),
-      p.place_of_birth   = coalesce(p.place_of_birth, $place_of_birth),
-      p.phone_number     = coalesce(p.phone_number, $phone_number),
-      p.address          = coalesce(p.address, $address),
-      p.passport_number  = coalesce(p.passport_number, $passport_number),
-      p.flight_number    = coalesce(p.flight_number, $flight_number),
-      p.departure_location = coalesce(p.departure_location, $departure_location),
-      p.arrival_location   = coalesce(p.arrival_location, $arrival_location),
-      p.arrest_location    = coalesce(p.arrest_location, $arrest_location),
-      p.arrival_date     = coalesce(p.arrival_date, $arrival_date),
-      p.departure_date   = coalesce(p.departure_date, $departure_date),
-      p.date_generic     = coalesce(p.date_generic, $date_generic),
-      p.money            = coalesce(p.money, $money),
-      p.license_plate    = coalesce(p.license_plate, $license_plate),
-      p.drivers_license  = coalesce(p.drivers_license, $drivers_license),
-      p.updated_at       = datetime()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    persons: Dict[str, Dict[str, Optional[str]]] = {}
+    organizations: Dict[str, Optional[str]] = {}
+    locations: Set[str] = set()
+    rels: Set[bytes] = set()
+    counts = {name: 0 for name in IMPORT_FILES}
+    cache = EntityCache()
+
+    with ExitStack() as stack:
+        def open_csv(name: str, header: List[str]):
+            f = stack.enter_context(open(out_dir / IMPORT_FILES[name], "w", newline="", encoding="utf-8"))
+            w = csv.writer(f)
+            w.writerow(header)
+            return w
+
+        records_w = open_csv("records", [
+            "record_id:ID(Record)", "description", "content_hash", "row_index:long", "source_file",
+            "created_at:datetime", "updated_at:datetime", ":LABEL",
+        ])
+        locations_w = open_csv("locations", ENTITY_HEADER + AUDIT_HEADER + [":LABEL"])
+        describes_w = open_csv("describes", [":START_ID(Record)", ":END_ID(Entity)", ":TYPE"])
+        person_orgs_w = open_csv("person_orgs", REL_HEADER)
+        person_locations_w = open_csv("person_locations", REL_HEADER)
+
+        def write_rel(name: str, w, rel_type: str, start: str, end: str):
+            key = _rel_key(rel_type, start, end)
+            if key in rels:
+                return
+            rels.add(key)
+            w.writerow([start, end, rel_type, "structured_text", now, now])
+            counts[name] += 1
+
+        def write_batch(batch: GraphBatch):
+            for r in batch.records:
+                records_w.writerow([r["record_id"], r["description"], r["content_hash"], r["row_index"],
+                                    r["source_file"], now, now, RECORD_LABEL])
+            counts["records"] += len(batch.records)
+            for p in batch.persons:
+                known = persons.setdefault(p["name"], {})
+                for key in PERSON_FIELDS:
+                    if known.get(key) is None:
+                        known[key] = p[key]
+            for o in batch.organizations:
+                if organizations.get(o["name"]) is None:
+                    organizations[o["name"]] = o["address"]
+            for loc in batch.locations:
+                if loc["name"] not in locations:
+                    locations.add(loc["name"])
+                    locations_w.writerow([_entity_id("GPE", loc["name"]), "GPE", loc["name"], loc["name"],
+                                          "structured_text", now, now, ENTITY_LABELS["GPE"]])
+                    counts["locations"] += 1
+            for d in batch.describes:
+                describes_w.writerow([d["record_id"], _entity_id("PERSON", d["name"]), "DESCRIBES"])
+            counts["describes"] += len(batch.describes)
+            for po in batch.person_orgs.values():
+                write_rel("person_orgs", person_orgs_w, "ASSOCIATED_WITH_ORG",
+                          _entity_id("PERSON", po["pname"]), _entity_id("ORG", po["oname"]))
+            for rel_type, rel_rows in batch.person_locations.items():
+                for pl in rel_rows.values():
+                    write_rel("person_locations", person_locations_w, rel_type,
+                              _entity_id("PERSON", pl["pname"]), _entity_id("GPE", pl["loc_name"]))
+
+        batch = new_batch(cache)
+        for record_id, row_index, description, content_hash in rows:
+            fields = extract_fields(description)
+            batch.add(record_id, row_index, description, content_hash,
+                      fields.get("person", {}), fields.get("organization", {}))
+            if len(batch) >= BATCH_SIZE:
+                write_batch(batch)
+                batch = new_batch(cache)
+        write_batch(batch)
+
+        persons_w = open_csv("persons", ENTITY_HEADER + PERSON_FIELDS + AUDIT_HEADER + [":LABEL"])
+        for name, props in persons.items():
+            persons_w.writerow([_entity_id("PERSON", name), "PERSON", name, name]
+                               + [props.get(k) for k in PERSON_FIELDS]
+                               + ["structured_text", now, now, ENTITY_LABELS["PERSON"]])
+        counts["persons"] = len(persons)
+        orgs_w = open_csv("organizations", ENTITY_HEADER + ["address"] + AUDIT_HEADER + [":LABEL"])
+        for name, address in organizations.items():
+            orgs_w.writerow([_entity_id("ORG", name), "ORG", name, name, address,
+                             "structured_text", now, now, ENTITY_LABELS["ORG"]])
+        counts["organizations"] = len(organizations)
+    return counts
+
+
+def import_command(out_dir: Path, database: str = "neo4j") -> str:
+    nodes = ("records", "persons", "organizations", "locations")
+    rels = ("describes", "person_orgs", "person_locations")
+    parts = [f"neo4j-admin database import full {database}", "--multiline-fields=true"]
+    parts += [f"--nodes={out_dir / IMPORT_FILES[n]}" for n in nodes]
+    parts += [f"--relationships={out_dir / IMPORT_FILES[r]}" for r in rels]
+    return " ".join(parts)
+
+
+def import_csv_graph(out_dir: Path) -> Tuple[Set[Tuple[str, str]], Set[Tuple[str, str, str]]]:
+    """(node keys, relationship triples) described by an export, in the same form as loaded_graph()."""
+    nodes: Set[Tuple[str, str]] = set()
+    rels: Set[Tuple[str, str, str]] = set()
+    for name in ("records", "persons", "organizations", "locations"):
+        with open(out_dir / IMPORT_FILES[name], newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if name == "records":
+                    nodes.add((RECORD_LABEL, row["record_id:ID(Record)"]))
+                else:
+                    nodes.add((row["entity_type"], row["canonical_text"]))
+    for name in ("describes", "person_orgs", "person_locations"):
+        with open(out_dir / IMPORT_FILES[name], newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                start = row.get(":START_ID(Record)") or row[":START_ID(Entity)"]
+                rels.add((row[":TYPE"], start, row[":END_ID(Entity)"]))
+    return nodes, rels
+
+
+def loaded_graph() -> Tuple[Set[Tuple[str, str]], Set[Tuple[str, str, str]]]:
+    """(node keys, relationship triples) currently in Neo4j, for comparison with an export."""
+    nodes = {(r["label"], r["key"]) for r in read(f"""
+    MATCH (r:{RECORD_LABEL}) RETURN '{RECORD_LABEL}' AS label, r.record_id AS key
+    UNION ALL
+    MATCH (e:Entity) RETURN e.entity_type AS label, e.canonical_text AS key
+    """)}
+    rels = {(r["type"], r["start"], r["end"]) for r in read(f"""
+    MATCH (a)-[rel]->(b:Entity)
+    WHERE a:{RECORD_LABEL} OR a:Entity
+    RETURN type(rel) AS type,
+           coalesce(a.record_id, a.entity_type + ':' + a.canonical_text) AS start,
+           b.entity_type + ':' + b.canonical_text AS end
+    """)}
+    return nodes, rels
+
+
+def verify_import_csv(out_dir: Path) -> bool:
     """
-    write(cypher, params)
-    return name
-
-
-def upsert_organization(org_fields: Dict[str, str]) -> Optional[str]:
-    name = clean_str(org_fields.get("name"))
-    if not name:
-        return None
-    address = clean_str(org_fields.get("address"))
-
-    params = {"name": name, "address": address}
-    cypher = """
-    MERGE (o:Entity:Organization {entity_type: 'ORG', canonical_text: $name})
-    ON CREATE SET
-      o.name       = $name,
-      o.address    = $address,
-      o.source     = 'structured_text',
-      o.created_at = datetime(),
-      o.updated_at = datetime()
-    ON MATCH SET
-      o.address    = coalesce(o.address, $address),
-      o.updated_at = datetime()
+    Compare an export with the graph the online loader built from the same file
+    (load it into an empty database first). Prints the differences; True when identical.
     """
-    write(cypher, params)
-    return name
+    csv_nodes, csv_rels = import_csv_graph(out_dir)
+    db_nodes, db_rels = loaded_graph()
+    ok = True
+    for what, exported, loaded in (("nodes", csv_nodes, db_nodes), ("relationships", csv_rels, db_rels)):
+        only_csv, only_db = exported - loaded, loaded - exported
+        print(f"{what}: {len(exported)} exported, {len(loaded)} in Neo4j")
+        for item in sorted(only_csv)[:20]:
+            print("  only in CSV:  ", item)
+        for item in sorted(only_db)[:20]:
+            print("  only in Neo4j:", item)
+        ok = ok and not only_csv and not only_db
+    print("Export matches the online graph." if ok else "Export differs from the online graph.")
+    return ok
 
 
-def upsert_location(name: str):
-    if not name:
-        return
-    params = {"name": name}
-    cypher = """
-    MERGE (l:Entity:Location {entity_type: 'GPE', canonical_text: $name})
-    ON CREATE SET
-      l.name       = $name,
-      l.source     = 'structured_text',
-      l.created_at = datetime(),
-      l.updated_at = datetime()
-    ON MATCH SET
-      l.updated_at = datetime()
-    """
-    write(cypher, params)
+# --- MAIN PIPELINE ---
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Load descriptions into Neo4j, or export them for neo4j-admin import.")
+    ap.add_argument("--export-import-csv", metavar="DIR", type=Path,
+                    help="Write neo4j-admin import CSVs to DIR instead of loading through Cypher (no Neo4j needed).")
+    ap.add_argument("--drop-legacy-records", action="store_true",
+                    help="One-off migration before loading: delete Records with positional DESC_<n> ids "
+                         "(written before content hashes were stored).")
+    ap.add_argument("--verify-import-csv", metavar="DIR", type=Path,
+                    help="Compare an export in DIR with the graph the online loader built, then exit.")
+    return ap.parse_args(argv)
+
+
+def run_export(out_dir: Path):
+    print("=== Loading Excel ===")
+    df = load_descriptions(EXCEL_PATH)
 
+    print(f"=== Writing import CSVs to {out_dir} ===")
+    counts = export_import_csv(plan_records(df), out_dir)
+    for name, n in counts.items():
+        print(f"  {IMPORT_FILES[name]:32} {n}")
+    print("Import into an empty database (stopped) with:")
+    print("  " + import_command(out_dir))
+    print("Constraints and indexes are created by the next online run (ensure_schema).")
 
-def connect_record_to_person(record_id: str, person_name: str):
-    params = {"record_id": record_id, "name": person_name}
-    cypher = f"""
-    MATCH (r:{RECORD_LABEL} {{record_id: $record_id}})
-    MATCH (p:Entity:Person {{entity_type:'PERSON', canonical_text:$name}})
-    MERGE (r)-[:DESCRIBES]->(p)
-    """
-    write(cypher, params)
-
-
-def connect_person_to_org(person_name: str, org_name: str):
-    params = {"pname": person_name, "oname": org_name}
-    cypher = """
-    MATCH (p:Entity:Person {entity_type:'PERSON', canonical_text:$pname})
-    MATCH (o:Entity:Organization {entity_type:'ORG', canonical_text:$oname})
-    MERGE (p)-[r:ASSOCIATED_WITH_ORG]->(o)
-    ON CREATE SET
-      r.source     = 'structured_text',
-      r.first_seen = datetime(),
-      r.last_seen  = datetime()
-    ON MATCH SET
-      r.last_seen  = datetime()
-    """
-    write(cypher, params)
-
-
-def connect_person_to_locations(person_name: str, person_fields: Dict[str, str]):
-    for field_key, rel_type in LOCATION_REL_MAP.items():
-        loc_name = clean_str(person_fields.get(field_key))
-        if not loc_name:
-            continue
-        upsert_location(loc_name)
-        params = {"pname": person_name, "loc_name": loc_name}
-        cypher = f"""
-        MATCH (p:Entity:Person {{entity_type:'PERSON', canonical_text:$pname}})
-        MATCH (l:Entity:Location {{entity_type:'GPE', canonical_text:$loc_name}})
-        MERGE (p)-[r:{rel_type}]->(l)
-        ON CREATE SET
-          r.source     = 'structured_text',
-          r.first_seen = datetime(),
-          r.last_seen  = datetime()
-        ON MATCH SET
-          r.last_seen  = datetime()
-        """
-        write(cypher, params)
 
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.export_import_csv:
+        run_export(args.export_import_csv)
+        return
+    if args.verify_import_csv:
+        if not verify_import_csv(args.verify_import_csv):
+            raise SystemExit(1)
+        return
 
-# --- MAIN PIPELINE ---
-def main():
     print("=== Ensuring schema ===")
     ensure_schema()
 
+    if args.drop_legacy_records:
+        print("=== Dropping legacy records ===")
+        print(f"{graph_batch.drop_legacy_records(driver, SCHEMA)} records without content_hash deleted")
+
     print("=== Loading Excel ===")
     df = load_descriptions(EXCEL_PATH)
 
+    print("=== Checking for unchanged records ===")
+    rows = skip_unchanged(plan_records(df))
+
     print("=== Processing rows ===")
-    for idx, row in df.iterrows():
-        description = clean_str(row["description"])
-        if not description:
-            continue
-
-        record_id = f"{RECORD_ID_PREFIX}{idx+1}"
-        upsert_record(record_id, idx + 1, description)
-
-        fields = extract_fields(description)
-        person_fields = fields.get("person", {})
-        org_fields = fields.get("organization", {})
-
-        person_name = upsert_person(person_fields) if person_fields else None
-        org_name = upsert_organization(org_fields) if org_fields else None
-
-        if person_name:
-            connect_record_to_person(record_id, person_name)
-            connect_person_to_locations(person_name, person_fields)
-            if org_name:
-                connect_person_to_org(person_name, org_name)
-
-        # Debug
-        print(f"[Record {record_id}]")
-        print("  description:", description)
-        print("  person_fields:", person_fields)
-        print("  org_fields:", org_fields)
-        print("")
+    with driver.session() as session:
+        writer = BatchWriter(session, new_batch, BATCH_SIZE)
+        for record_id, row_index, description, content_hash in rows:
+            fields = extract_fields(description)
+            person_fields = fields.get("person", {})
+            org_fields = fields.get("organization", {})
+            writer.add((record_id, row_index, description, content_hash, person_fields, org_fields))
+            if DEBUG_RECORDS:
+                print(f"[Record {record_id}]")
+                print("  description:", description)
+                print("  person_fields:", person_fields)
+                print("  org_fields:", org_fields)
+                print("")
+        writer.flush()
+    print(f"  written {writer.written}/{len(rows)}")
+    refreshed = touch_cached_entities()
+    stats = ENTITY_CACHE.stats()
+    print(f"Entities: {stats['written']} written, {stats['skipped']} repeats skipped, {refreshed} refreshed")
+
+    if PROFILE_RULES:
+        print("=== Rule report ===")
+        print(EXTRACTOR.format_report())
 
     print("=== Sample graph ===")
     people = read("""
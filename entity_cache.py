@@ -0,0 +1,84 @@
+"""
+entity_cache.py
+Bounded in-process cache of graph entity keys written during one load.
+
+The same Locations and Organizations recur across thousands of rows. The graph
+loaders ask the cache before queueing an entity MERGE:
+- a key not seen yet (or seen without a property the row now carries, e.g. an
+  organization address) is remembered and written;
+- a key already written in this run is skipped and flagged as seen again.
+
+Flagged keys only need their `updated_at` refreshed. They are handed back in bulk:
+keys evicted from the LRU since the last flush go out with the next batch, the
+rest with one statement at the end of the run.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Tuple
+
+EntityKey = Tuple[str, str]  # (entity_type, canonical_text)
+
+
+def _touch_row(key: EntityKey) -> Dict[str, str]:
+    return {"entity_type": key[0], "canonical_text": key[1]}
+
+
+class EntityCache:
+    """LRU of (entity_type, canonical_text) keys written in this run, capped at `max_size`."""
+
+    def __init__(self, max_size: int = 100_000) -> None:
+        self.max_size = max_size
+        # key -> [properties written, seen again since written]
+        self._entries: "OrderedDict[EntityKey, List]" = OrderedDict()
+        self._evicted_stale: List[EntityKey] = []
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def seen(self, key: EntityKey, props: FrozenSet[str] = frozenset()) -> bool:
+        """
+        True when `key` was already written with at least `props` set (the write can be skipped).
+        Otherwise the key is remembered as written and False is returned.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if props <= entry[0]:
+                entry[1] = True
+                self.hits += 1
+                return True
+            # New property to fill in: write again, which also refreshes updated_at
+            entry[0] = entry[0] | props
+            entry[1] = False
+            self.misses += 1
+            return False
+
+        self.misses += 1
+        self._entries[key] = [frozenset(props), False]
+        if len(self._entries) > self.max_size:
+            old_key, (_, stale) = self._entries.popitem(last=False)
+            if stale:
+                self._evicted_stale.append(old_key)
+        return False
+
+    def take_evicted(self) -> List[Dict[str, str]]:
+        """Keys seen again and then evicted since the last call, as touch rows."""
+        rows = [_touch_row(k) for k in self._evicted_stale]
+        self._evicted_stale = []
+        return rows
+
+    def take_stale(self) -> List[Dict[str, str]]:
+        """Every key seen again since it was written (evicted or not), as touch rows; clears the flags."""
+        rows = self.take_evicted()
+        for key, entry in self._entries.items():
+            if entry[1]:
+                entry[1] = False
+                rows.append(_touch_row(key))
+        return rows
+
+    def stats(self) -> Dict[str, int]:
+        return {"written": self.misses, "skipped": self.hits, "cached": len(self._entries)}
@@ -0,0 +1,421 @@
+"""
+graph_batch.py
+Batched Neo4j writes shared by the graph loaders (new.py, descriptions_to_graph_generic.py).
+
+- GraphSchema: the graph model read from a rules file (record label, id prefix, key column,
+  location relationships) and the record statements that depend on it.
+- plan_records / skip_unchanged: stable record ids, and skipping rows whose description
+  hash is already in the graph.
+- GraphBatch / flush_batch: extracted rows grouped per statement. Each statement takes a
+  list of row maps and applies it with a single `UNWIND $rows AS row ...`, so a batch costs
+  a handful of round trips instead of ~10 per spreadsheet row.
+- BatchWriter: the write loop (add rows, flush every BATCH_SIZE) used by every loader.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from entity_cache import EntityCache
+from profiling import span
+
+HASH_LOOKUP_BATCH = 10000
+TOUCH_BATCH = 1000
+
+# (record_id, row_index, description, content_hash)
+PlannedRow = Tuple[str, int, str, str]
+# PlannedRow + (person_fields, org_fields)
+ExtractedRow = Tuple[str, int, str, str, Dict[str, str], Dict[str, str]]
+
+
+def clean_str(v) -> Optional[str]:
+    if v is None:
+        return None
+    if isinstance(v, float) and pd.isna(v):
+        return None
+    s = str(v).strip()
+    return s if s else None
+
+
+class GraphSchema:
+    """Graph model settings from a rules file, plus the statements that name the record label."""
+
+    def __init__(self, rules: Dict[str, Any], source_name: str,
+                 org_rel_types: Iterable[str] = ("ASSOCIATED_WITH_ORG",)) -> None:
+        record = rules.get("record", {}) or {}
+        self.record_label: str = record.get("label", "Record")
+        self.id_prefix: str = record.get("id_prefix", "DESC_")
+        self.key_column: Optional[str] = record.get("key_column")
+        self.location_rel_map: Dict[str, str] = rules.get("location_relationships", {}) or {}
+        self.source_name = source_name
+        # person -> organization relationship types written for every pair
+        self.org_rel_types = tuple(org_rel_types)
+
+        # A changed description may no longer describe the same person: a record's outgoing
+        # relationships are dropped in the same transaction before it is re-written
+        self.clear_record_edges = f"""
+UNWIND $rows AS row
+MATCH (r:{self.record_label} {{record_id: row.record_id}})-[rel]->()
+DELETE rel
+"""
+        self.upsert_records = f"""
+UNWIND $rows AS row
+MERGE (r:{self.record_label} {{record_id: row.record_id}})
+ON CREATE SET
+  r.description  = row.description,
+  r.content_hash = row.content_hash,
+  r.row_index    = row.row_index,
+  r.source_file  = row.source_file,
+  r.created_at   = datetime(),
+  r.updated_at   = datetime()
+ON MATCH SET
+  r.description  = row.description,
+  r.content_hash = row.content_hash,
+  r.row_index    = row.row_index,
+  r.updated_at   = datetime()
+"""
+        self.connect_records_to_persons = f"""
+UNWIND $rows AS row
+MATCH (r:{self.record_label} {{record_id: row.record_id}})
+MATCH (p:Entity:Person {{entity_type:'PERSON', canonical_text: row.name}})
+MERGE (r)-[:DESCRIBES]->(p)
+"""
+
+
+# --- RECORD IDS (incremental loads) ---
+# record_id comes from record.key_column when configured, otherwise from a hash of the
+# description, so ids survive rows being inserted or reordered. The description hash is
+# stored on the Record; rows whose hash is already in the graph are skipped entirely.
+def description_hash(description: str) -> str:
+    return hashlib.blake2b(description.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _key_str(v) -> Optional[str]:
+    # Excel hands integer ids back as floats (123.0)
+    if isinstance(v, float) and not pd.isna(v) and v.is_integer():
+        v = int(v)
+    return clean_str(v)
+
+
+def plan_records(schema: GraphSchema, df: pd.DataFrame, seen: Optional[Set[str]] = None) -> List[PlannedRow]:
+    """
+    Stable record ids and content hashes for every non-empty description (first occurrence wins).
+    Pass the same `seen` set for every chunk of a streamed file to de-duplicate across chunks.
+    """
+    key_column = schema.key_column
+    if key_column and key_column not in df.columns:
+        raise ValueError(f"Key column '{key_column}' (record.key_column) not found in the Excel file.")
+    keys = df[key_column] if key_column else [None] * len(df)
+    planned: List[PlannedRow] = []
+    if seen is None:
+        seen = set()
+    for idx, raw, key in zip(df.index, df["description"], keys):
+        description = clean_str(raw)
+        if not description:
+            continue
+        content_hash = description_hash(description)
+        record_id = f"{schema.id_prefix}{_key_str(key) or content_hash}"
+        if record_id in seen:
+            continue
+        seen.add(record_id)
+        planned.append((record_id, idx + 1, description, content_hash))
+    return planned
+
+
+def existing_hashes(driver, schema: GraphSchema, record_ids: List[str]) -> Dict[str, Optional[str]]:
+    """record_id -> stored content_hash for the ids already in the graph (bulk lookups)."""
+    cypher = f"""
+    UNWIND $ids AS id
+    MATCH (r:{schema.record_label} {{record_id: id}})
+    RETURN r.record_id AS record_id, r.content_hash AS content_hash
+    """
+    found: Dict[str, Optional[str]] = {}
+    with driver.session() as s:
+        for i in range(0, len(record_ids), HASH_LOOKUP_BATCH):
+            for r in s.run(cypher, ids=record_ids[i:i + HASH_LOOKUP_BATCH]).data():
+                found[r["record_id"]] = r["content_hash"]
+    return found
+
+
+def skip_unchanged(driver, schema: GraphSchema, planned: List[PlannedRow],
+                   full_reload: bool = False) -> List[PlannedRow]:
+    """The planned rows whose description changed or is new; `full_reload` keeps them all."""
+    if full_reload:
+        return planned
+    known = existing_hashes(driver, schema, [p[0] for p in planned])
+    return [p for p in planned if known.get(p[0]) != p[3]]
+
+
+def drop_legacy_records(driver, schema: GraphSchema, batch_size: int = 10000) -> int:
+    """
+    One-off migration: delete the Records written before ids were stable (DESC_<row number>,
+    no content_hash) with their relationships, so a reload does not leave them next to the
+    same rows under their new ids. Entities are kept. Returns the number of records deleted.
+    """
+    cypher = f"""
+    MATCH (r:{schema.record_label})
+    WHERE r.content_hash IS NULL
+    WITH r LIMIT $limit
+    DETACH DELETE r
+    RETURN count(*) AS deleted
+    """
+    total = 0
+    with driver.session() as s:
+        while True:
+            deleted = s.execute_write(lambda tx: tx.run(cypher, limit=batch_size).single()["deleted"])
+            total += deleted
+            if deleted < batch_size:
+                return total
+
+
+# --- GRAPH UPSERTS (batched) ---
+UPSERT_PERSONS = """
+UNWIND $rows AS row
+MERGE (p:Entity:Person {entity_type: 'PERSON', canonical_text: row.name})
+ON CREATE SET
+  p.name               = row.name,
+  p.dob                = row.dob,
+  p.citizenship        = row.citizenship,
+  p.place_of_birth     = row.place_of_birth,
+  p.phone_number       = row.phone_number,
+  p.address            = row.address,
+  p.passport_number    = row.passport_number,
+  p.flight_number      = row.flight_number,
+  p.departure_location = row.departure_location,
+  p.arrival_location   = row.arrival_location,
+  p.arrest_location    = row.arrest_location,
+  p.arrival_date       = row.arrival_date,
+  p.departure_date     = row.departure_date,
+  p.date_generic       = row.date_generic,
+  p.money              = row.money,
+  p.license_plate      = row.license_plate,
+  p.drivers_license    = row.drivers_license,
+  p.residence_location = row.residence_location,
+  p.source             = 'structured_text',
+  p.created_at         = datetime(),
+  p.updated_at         = datetime()
+ON MATCH SET
+  p.dob                = coalesce(p.dob, row.dob),
+  p.citizenship        = coalesce(p.citizenship, row.citizenship),
+  p.place_of_birth     = coalesce(p.place_of_birth, row.place_of_birth),
+  p.phone_number       = coalesce(p.phone_number, row.phone_number),
+  p.address            = coalesce(p.address, row.address),
+  p.passport_number    = coalesce(p.passport_number, row.passport_number),
+  p.flight_number      = coalesce(p.flight_number, row.flight_number),
+  p.departure_location = coalesce(p.departure_location, row.departure_location),
+  p.arrival_location   = coalesce(p.arrival_location, row.arrival_location),
+  p.arrest_location    = coalesce(p.arrest_location, row.arrest_location),
+  p.arrival_date       = coalesce(p.arrival_date, row.arrival_date),
+  p.departure_date     = coalesce(p.departure_date, row.departure_date),
+  p.date_generic       = coalesce(p.date_generic, row.date_generic),
+  p.money              = coalesce(p.money, row.money),
+  p.license_plate      = coalesce(p.license_plate, row.license_plate),
+  p.drivers_license    = coalesce(p.drivers_license, row.drivers_license),
+  p.residence_location = coalesce(p.residence_location, row.residence_location),
+  p.updated_at         = datetime()
+"""
+
+UPSERT_ORGANIZATIONS = """
+UNWIND $rows AS row
+MERGE (o:Entity:Organization {entity_type: 'ORG', canonical_text: row.name})
+ON CREATE SET
+  o.name       = row.name,
+  o.address    = row.address,
+  o.source     = 'structured_text',
+  o.created_at = datetime(),
+  o.updated_at = datetime()
+ON MATCH SET
+  o.address    = coalesce(o.address, row.address),
+  o.updated_at = datetime()
+"""
+
+TOUCH_ENTITIES = """
+UNWIND $rows AS row
+MATCH (e:Entity {entity_type: row.entity_type, canonical_text: row.canonical_text})
+SET e.updated_at = datetime()
+"""
+
+UPSERT_LOCATIONS = """
+UNWIND $rows AS row
+MERGE (l:Entity:Location {entity_type: 'GPE', canonical_text: row.name})
+ON CREATE SET
+  l.name       = row.name,
+  l.source     = 'structured_text',
+  l.created_at = datetime(),
+  l.updated_at = datetime()
+ON MATCH SET
+  l.updated_at = datetime()
+"""
+
+
+def person_org_cypher(rel_type: str) -> str:
+    return f"""
+    UNWIND $rows AS row
+    MATCH (p:Entity:Person {{entity_type:'PERSON', canonical_text: row.pname}})
+    MATCH (o:Entity:Organization {{entity_type:'ORG', canonical_text: row.oname}})
+    MERGE (p)-[r:{rel_type}]->(o)
+    ON CREATE SET
+      r.source     = 'structured_text',
+      r.first_seen = datetime(),
+      r.last_seen  = datetime()
+    ON MATCH SET
+      r.last_seen  = datetime()
+    """
+
+
+def person_location_cypher(rel_type: str) -> str:
+    # Relationship types cannot be parameterized: one statement per type
+    return f"""
+    UNWIND $rows AS row
+    MATCH (p:Entity:Person {{entity_type:'PERSON', canonical_text: row.pname}})
+    MATCH (l:Entity:Location {{entity_type:'GPE', canonical_text: row.loc_name}})
+    MERGE (p)-[r:{rel_type}]->(l)
+    ON CREATE SET
+      r.source     = 'structured_text',
+      r.first_seen = datetime(),
+      r.last_seen  = datetime()
+    ON MATCH SET
+      r.last_seen  = datetime()
+    """
+
+
+PERSON_FIELDS = [
+    "dob", "citizenship", "place_of_birth", "phone_number", "address",
+    "passport_number", "flight_number", "departure_location", "arrival_location",
+    "arrest_location", "arrival_date", "departure_date", "date_generic", "money",
+    "license_plate", "drivers_license", "residence_location",
+]
+
+
+class GraphBatch:
+    """Rows extracted from the spreadsheet, grouped per statement until flushed."""
+
+    def __init__(self, schema: GraphSchema, cache: EntityCache) -> None:
+        self.schema = schema
+        self.cache = cache
+        self.records: List[Dict[str, Any]] = []
+        self.persons: List[Dict[str, Any]] = []
+        self.organizations: List[Dict[str, Any]] = []
+        self.locations: List[Dict[str, Any]] = []
+        self.touches: List[Dict[str, str]] = []
+        self.describes: List[Dict[str, Any]] = []
+        # relationship rows keyed by their endpoints, so repeats within a batch collapse
+        self.person_orgs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.person_locations: Dict[str, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add(self, record_id: str, row_index: int, description: str, content_hash: str,
+            person_fields: Dict[str, str], org_fields: Dict[str, str]):
+        self.records.append({
+            "record_id": record_id,
+            "row_index": row_index,
+            "description": description,
+            "content_hash": content_hash,
+            "source_file": self.schema.source_name,
+        })
+
+        person_name = clean_str(person_fields.get("name")) if person_fields else None
+        org_name = clean_str(org_fields.get("name")) if org_fields else None
+
+        if person_name:
+            row = {"name": person_name}
+            for key in PERSON_FIELDS:
+                row[key] = clean_str(person_fields.get(key))
+            self.persons.append(row)
+        if org_name:
+            address = clean_str(org_fields.get("address"))
+            if not self.cache.seen(("ORG", org_name), frozenset(["address"]) if address else frozenset()):
+                self.organizations.append({"name": org_name, "address": address})
+
+        if person_name:
+            self.describes.append({"record_id": record_id, "name": person_name})
+            for field_key, rel_type in self.schema.location_rel_map.items():
+                loc_name = clean_str(person_fields.get(field_key))
+                if not loc_name:
+                    continue
+                if not self.cache.seen(("GPE", loc_name)):
+                    self.locations.append({"name": loc_name})
+                self.person_locations.setdefault(rel_type, {})[(person_name, loc_name)] = (
+                    {"pname": person_name, "loc_name": loc_name}
+                )
+            if org_name:
+                self.person_orgs[(person_name, org_name)] = {"pname": person_name, "oname": org_name}
+
+    def statements(self):
+        """(cypher, rows) pairs in dependency order: nodes first, then relationships."""
+        yield self.schema.clear_record_edges, self.records
+        yield self.schema.upsert_records, self.records
+        yield UPSERT_PERSONS, self.persons
+        yield UPSERT_ORGANIZATIONS, self.organizations
+        yield UPSERT_LOCATIONS, self.locations
+        yield TOUCH_ENTITIES, self.touches
+        yield self.schema.connect_records_to_persons, self.describes
+        for rel_type in self.schema.org_rel_types:
+            yield person_org_cypher(rel_type), list(self.person_orgs.values())
+        for rel_type, rows in self.person_locations.items():
+            yield person_location_cypher(rel_type), list(rows.values())
+
+
+def _apply_batch(tx, batch: GraphBatch):
+    for cypher, rows in batch.statements():
+        if rows:
+            tx.run(cypher, rows=rows).consume()
+
+
+def flush_batch(session, batch: GraphBatch):
+    """Apply one batch in a single managed write transaction (retried on transient errors)."""
+    # Taken before the transaction so a retry sees the same rows
+    batch.touches.extend(batch.cache.take_evicted())
+    if len(batch) or batch.touches:
+        with span("flush_batch", rows=len(batch)):
+            session.execute_write(_apply_batch, batch)
+
+
+class BatchWriter:
+    """
+    Adds extracted rows to GraphBatches and flushes one every `batch_size` rows on `session`.
+    Names of the persons written are collected in `touched` for incremental derivations.
+    """
+
+    def __init__(self, session, new_batch: Callable[[], GraphBatch], batch_size: int,
+                 touched: Optional[Set[str]] = None) -> None:
+        self.session = session
+        self.new_batch = new_batch
+        self.batch_size = batch_size
+        self.touched: Set[str] = touched if touched is not None else set()
+        self.written = 0
+        self.batch = new_batch()
+
+    def add(self, row: ExtractedRow) -> None:
+        self.batch.add(*row)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def add_all(self, rows: Iterable[ExtractedRow]) -> None:
+        for row in rows:
+            self.add(row)
+
+    def flush(self) -> None:
+        flush_batch(self.session, self.batch)
+        self.touched.update(p["name"] for p in self.batch.persons)
+        self.written += len(self.batch)
+        self.batch = self.new_batch()
+
+
+def _touch_entities(tx, rows: List[Dict[str, str]]):
+    for i in range(0, len(rows), TOUCH_BATCH):
+        tx.run(TOUCH_ENTITIES, rows=rows[i:i + TOUCH_BATCH]).consume()
+
+
+def touch_cached_entities(driver, cache: EntityCache) -> int:
+    """End of run: one write refreshing updated_at on every entity whose re-MERGE was skipped."""
+    rows = cache.take_stale()
+    if rows:
+        with driver.session() as s:
+            s.execute_write(_touch_entities, rows)
+    return len(rows)
@@ -0,0 +1,140 @@
+"""
+graph_context.py
+Graph neighborhoods (Person, Organization, Location) for search hits, fetched in bulk.
+
+A hit is joined to its :Record the way the graph loaders assign ids (rules.yml `record`):
+`id_prefix` + the `key_column` value when configured, otherwise + the blake2b hash of
+the description. All ids of a result page are looked up with one `UNWIND` query, and
+neighborhoods are kept in an LRU cache so hot records cost no round trip at all.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+PERSON_PROPERTIES = ["dob", "citizenship", "passport_number", "flight_number", "phone_number"]
+
+_ABSENT: Dict[str, Any] = {}  # cached "record not in the graph"
+
+
+class GraphContext:
+    """Batched, cached record -> neighborhood lookups against the loaders' graph model."""
+
+    def __init__(
+        self,
+        uri: str = "neo4j://localhost:7687",
+        user: str = "neo4j",
+        password: str = "neo4j123",
+        rules_path: Union[str, Path] = "rules.yml",
+        cache_size: int = 1024,
+        driver: Any = None,
+    ) -> None:
+        import yaml
+
+        with open(rules_path, "r", encoding="utf-8") as f:
+            record = (yaml.safe_load(f) or {}).get("record", {}) or {}
+        self.record_label = record.get("label", "Record")
+        self.id_prefix = record.get("id_prefix", "DESC_")
+        self.key_column = record.get("key_column")
+        if driver is None:
+            from neo4j import GraphDatabase  # only needed for graph-enriched search
+
+            driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driver
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "cache_hits": 0, "queries": 0}
+        props = ", ".join(f".{p}" for p in PERSON_PROPERTIES)
+        self._cypher = f"""
+        UNWIND $ids AS id
+        MATCH (r:{self.record_label} {{record_id: id}})
+        OPTIONAL MATCH (r)-[:DESCRIBES]->(p:Person)
+        OPTIONAL MATCH (p)-[rel]->(n:Entity)
+        WHERE n:Organization OR n:Location
+        RETURN id AS record_id,
+               p {{.name, {props}}} AS person,
+               collect(DISTINCT CASE WHEN n:Organization THEN {{name: n.name, rel: type(rel)}} END) AS organizations,
+               collect(DISTINCT CASE WHEN n:Location THEN {{name: n.name, rel: type(rel)}} END) AS locations
+        """
+
+    def close(self) -> None:
+        self.driver.close()
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def record_id_for(self, hit: Dict[str, Any], description_col: str) -> Optional[str]:
+        if self.key_column:
+            key = hit.get(self.key_column)
+            if key is not None and not (isinstance(key, float) and pd.isna(key)):
+                if isinstance(key, float) and key.is_integer():
+                    key = int(key)
+                return f"{self.id_prefix}{key}"
+        text = hit.get(description_col)
+        if text is None or (isinstance(text, float) and pd.isna(text)) or not str(text).strip():
+            return None
+        digest = hashlib.blake2b(str(text).strip().encode("utf-8"), digest_size=16).hexdigest()
+        return f"{self.id_prefix}{digest}"
+
+    def neighborhoods(self, record_ids: Sequence[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        record_id -> {"persons": [...], "organizations": [...], "locations": [...]}, or None when
+        the record is not in the graph. One query covers every id missing from the cache.
+        """
+        found: Dict[str, Optional[Dict[str, Any]]] = {}
+        missing: List[str] = []
+        with self._lock:
+            for rid in dict.fromkeys(record_ids):
+                self.stats["lookups"] += 1
+                hood = self._cache.get(rid)
+                if hood is None:
+                    missing.append(rid)
+                else:
+                    self._cache.move_to_end(rid)
+                    self.stats["cache_hits"] += 1
+                    found[rid] = None if hood is _ABSENT else hood
+        if not missing:
+            return found
+
+        fetched: Dict[str, Optional[Dict[str, Any]]] = dict.fromkeys(missing)
+        with self.driver.session() as s:
+            rows = s.run(self._cypher, ids=missing).data()
+        for row in rows:
+            hood = fetched[row["record_id"]]
+            if hood is None:
+                hood = fetched[row["record_id"]] = {"persons": [], "organizations": [], "locations": []}
+            if row["person"] and row["person"].get("name"):
+                hood["persons"].append(row["person"])
+            for key in ("organizations", "locations"):
+                for item in row[key]:
+                    if item not in hood[key]:
+                        hood[key].append(item)
+
+        with self._lock:
+            self.stats["queries"] += 1
+            for rid, hood in fetched.items():
+                self._cache[rid] = _ABSENT if hood is None else hood
+                self._cache.move_to_end(rid)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        found.update(fetched)
+        return found
+
+    def enrich(self, hits: pd.DataFrame, description_col: str) -> pd.DataFrame:
+        """Add `record_id` and `graph` (the neighborhood, or None when the record is not in the graph)."""
+        if hits.empty:
+            return hits
+        hits = hits.copy()
+        ids = [self.record_id_for(h, description_col) for h in hits.to_dict(orient="records")]
+        hoods = self.neighborhoods([i for i in ids if i])
+        hits["record_id"] = ids
+        hits["graph"] = [hoods.get(i) if i else None for i in ids]
+        return hits
@@ -0,0 +1,107 @@
+"""
+ner_extractor.py
+Optional spaCy NER stage for the graph loader (rules.yml `spacy_model` / `entities` / `ner`).
+
+Texts are streamed through one `nlp.pipe` call (batched, optionally over `n_process`
+worker processes) with every pipeline component except NER and what it depends on
+disabled. Each document yields {label: [entity text, ...]} for the labels listed under
+`entities` in rules.yml; the loader uses them to fill fields the regexes missed.
+
+spaCy is only imported when the stage is built, so the loader runs without it.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Components NER needs; everything else (parser, tagger, lemmatizer, ...) is disabled
+_NER_DEPENDENCIES = ("tok2vec", "transformer", "ner")
+
+
+class NerExtractor:
+    """Batched spaCy entity extraction with throughput accounting."""
+
+    def __init__(
+        self,
+        model: str,
+        labels: Iterable[str],
+        batch_size: int = 256,
+        n_process: int = 1,
+    ) -> None:
+        try:
+            import spacy
+        except ImportError as e:
+            raise ImportError(
+                "The NER stage needs spaCy: pip install spacy && python -m spacy download " + model
+            ) from e
+        self.nlp = spacy.load(model)
+        self.nlp.select_pipes(enable=[p for p in self.nlp.pipe_names if p in _NER_DEPENDENCIES])
+        self.model = model
+        self.labels = set(labels)
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.docs = 0
+        self.seconds = 0.0
+
+    def iter_entities(self, texts: Iterable[str]) -> Iterator[Dict[str, List[str]]]:
+        """
+        {label: [unique entity texts in order of appearance]} per text, in input order.
+        `seconds` is wall-clock time from the first request to the last document.
+        """
+        start = time.perf_counter()
+        try:
+            for doc in self.nlp.pipe(texts, batch_size=self.batch_size, n_process=self.n_process):
+                found: Dict[str, List[str]] = {}
+                for ent in doc.ents:
+                    if ent.label_ not in self.labels:
+                        continue
+                    text = ent.text.strip()
+                    values = found.setdefault(ent.label_, [])
+                    if text and text not in values:
+                        values.append(text)
+                self.docs += 1
+                yield found
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def entities_many(self, texts: Iterable[str]) -> List[Dict[str, List[str]]]:
+        return list(self.iter_entities(texts))
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.docs / self.seconds if self.seconds else 0.0
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "docs": self.docs,
+            "seconds": round(self.seconds, 3),
+            "docs_per_sec": round(self.docs_per_sec, 1),
+            "batch_size": self.batch_size,
+            "n_process": self.n_process,
+        }
+
+
+def merge_entities(
+    person_fields: Dict[str, str],
+    org_fields: Dict[str, str],
+    entities: Dict[str, List[str]],
+    fill_fields: Dict[str, str],
+) -> None:
+    """
+    Fill fields the regexes left empty, in place. `fill_fields` maps an entity label to
+    "person.<field>" or "organization.<field>"; the first entity not already used as a
+    value of that group wins. Regex values are never overwritten.
+    """
+    groups = {"person": person_fields, "organization": org_fields}
+    for label, target in (fill_fields or {}).items():
+        group, _, field = target.partition(".")
+        fields: Optional[Dict[str, str]] = groups.get(group)
+        if fields is None or not field or fields.get(field):
+            continue
+        used = set(fields.values())
+        for text in entities.get(label, ()):
+            if text not in used:
+                fields[field] = text
+                break
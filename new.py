@@ -13,7 +13,7 @@ Config: relation_rules.yml
 
 Graph model:
 
-  (:Record {record_id, description, row_index, source_file})
+  (:Record {record_id, description, content_hash, row_index, source_file})
   (:Entity:Person {
       name, dob, citizenship, place_of_birth, phone_number,
       address, passport_number, flight_number, residence_location,
@@ -31,16 +31,31 @@ Graph model:
   (:Person)-[:ARRIVED_AT]->(:Location)                 (arrival_location)
   (:Person)-[:LIVES_IN]->(:Location)                   (residence_location)
   (:Person)-[:ARRESTED_AT]->(:Location)                (arrest_location)
+  (:Person)-[:ASSOCIATED_WITH_LOCATION]->(:Location)   (GPE found by the optional NER stage)
 
   (p1:Person)-[:TRAVELED_SAME_FLIGHT]->(p2:Person)     (derived from flight_number)
 """
 
 from neo4j import GraphDatabase
 from pathlib import Path
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import yaml
-import re
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterable, List, Set
+
+from entity_cache import EntityCache
+import graph_batch
+from graph_batch import BatchWriter, ExtractedRow, GraphBatch, GraphSchema, PlannedRow, clean_str
+from field_extractor import FieldExtractor
+from ner_extractor import NerExtractor, merge_entities
+import profiling
+from profiling import traced
 
 # --- BASIC CONFIG ---
 NEO4J_URI  = "neo4j://localhost:7687"
@@ -51,17 +66,14 @@ EXCEL_PATH  = Path("descriptions_only.xlsx")
 RULES_PATH  = Path("rules.yml")
 SOURCE_NAME = EXCEL_PATH.name
 
-
-# --- HELPERS ---
-def clean_str(v) -> Optional[str]:
-    if v is None:
-        return None
-    if isinstance(v, float) and pd.isna(v):
-        return None
-    s = str(v).strip()
-    return s if s else None
+# Pipelined load: extraction processes -> bounded queue -> one graph writer
+EXTRACT_WORKERS  = os.cpu_count() or 1   # 0 = extract in-process
+EXTRACT_CHUNK    = 500                   # rows per extraction task
+WRITE_QUEUE_SIZE = 8                     # extracted chunks buffered ahead of the writer
+DEBUG_RECORDS    = False                 # print every record's extracted fields
 
 
+# --- HELPERS ---
 def load_rules(path: Path) -> Dict[str, Any]:
     if not path.exists():
         raise FileNotFoundError(f"Missing rules file: {path}")
@@ -71,17 +83,20 @@ def load_rules(path: Path) -> Dict[str, Any]:
 
 rules = load_rules(RULES_PATH)
 
-RECORD_LABEL = rules.get("record", {}).get("label", "Record")
-RECORD_ID_PREFIX = rules.get("record", {}).get("id_prefix", "DESC_")
+# generic association + more semantic employment relationship
+SCHEMA = GraphSchema(rules, SOURCE_NAME, org_rel_types=("ASSOCIATED_WITH_ORG", "WORKS_FOR"))
+RECORD_LABEL = SCHEMA.record_label
+RECORD_ID_PREFIX = SCHEMA.id_prefix
 ENTITY_CONFIG = rules.get("entities", {})
 FIELD_PATTERNS = rules.get("field_patterns", {})
-LOCATION_REL_MAP = rules.get("location_relationships", {})
+LOCATION_REL_MAP = SCHEMA.location_rel_map
 
 
 # --- NEO4J DRIVER ---
 driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASS))
 
 
+@traced("write")
 def write(cypher: str, params: Optional[dict] = None):
     with driver.session() as s:
         s.run(cypher, **(params or {}))
@@ -108,6 +123,13 @@ def ensure_schema():
     REQUIRE (e.entity_type, e.canonical_text) IS UNIQUE
     """)
 
+    # Same-flight derivation looks people up by flight_number
+    write("""
+    CREATE INDEX person_flight_number IF NOT EXISTS
+    FOR (p:Person)
+    ON (p.flight_number)
+    """)
+
 
 # --- EXCEL LOADER ---
 def load_descriptions(path: Path) -> pd.DataFrame:
@@ -121,7 +143,36 @@ def load_descriptions(path: Path) -> pd.DataFrame:
     return df
 
 
+# --- RECORD IDS (incremental loads) ---
+# Stable record ids and unchanged-row skipping, see graph_batch.py.
+RECORD_KEY_COLUMN = SCHEMA.key_column
+FULL_RELOAD = False          # True = re-upsert every row, changed or not
+
+
+def plan_records(df: pd.DataFrame, seen: Optional[Set[str]] = None) -> List[PlannedRow]:
+    """Stable record ids for every non-empty description; share `seen` across chunks of one file."""
+    return graph_batch.plan_records(SCHEMA, df, seen)
+
+
+def existing_hashes(record_ids: List[str]) -> Dict[str, Optional[str]]:
+    return graph_batch.existing_hashes(driver, SCHEMA, record_ids)
+
+
+def skip_unchanged(planned: List[PlannedRow]) -> List[PlannedRow]:
+    if FULL_RELOAD:
+        return planned
+    changed = graph_batch.skip_unchanged(driver, SCHEMA, planned)
+    print(f"{len(planned) - len(changed)} unchanged records skipped, {len(changed)} to load")
+    return changed
+
+
 # --- FIELD EXTRACTION FROM TEXT ---
+# Rules are compiled once; set PROFILE_RULES to time every pattern and print a report.
+PROFILE_RULES = False
+EXTRACTOR = FieldExtractor(FIELD_PATTERNS, profile=PROFILE_RULES)
+
+
+@traced("extract_fields")
 def extract_fields(text: str) -> Dict[str, Dict[str, str]]:
     """
     Apply regex patterns from YAML to a description.
@@ -131,245 +182,98 @@ def extract_fields(text: str) -> Dict[str, Dict[str, str]]:
         "organization": {field -> value, ...}
       }
     """
-    result = {"person": {}, "organization": {}}
-
-    for group_name, group_cfg in FIELD_PATTERNS.items():
-        group_out: Dict[str, str] = {}
-        for field_name, field_cfg in group_cfg.items():
-            patterns: List[str] = field_cfg.get("patterns", [])
-            value_found: Optional[str] = None
-            for pat in patterns:
-                m = re.search(pat, text, flags=re.IGNORECASE)
-                if m:
-                    raw = m.group("value")
-                    val = raw.strip().strip('",; ')
-                    if val:
-                        value_found = val
-                        break
-            if value_found:
-                group_out[field_name] = value_found
-        result[group_name] = group_out
-
-    return result
-
-
-# --- GRAPH UPSERTS ---
-def upsert_record(record_id: str, row_index: int, description: str):
-    params = {
-        "record_id": record_id,
-        "row_index": row_index,
-        "description": description,
-        "source_file": SOURCE_NAME,
-    }
-    cypher = f"""
-    MERGE (r:{RECORD_LABEL} {{record_id: $record_id}})
-    ON CREATE SET
-      r.description = $description,
-      r.row_index   = $row_index,
-      r.source_file = $source_file,
-      r.created_at  = datetime(),
-      r.updated_at  = datetime()
-    ON MATCH SET
-      r.description = $description,
-      r.updated_at  = datetime()
-    """
-    write(cypher, params)
+    return EXTRACTOR.extract(text)
 
 
-def upsert_person(person_fields: Dict[str, str]) -> Optional[str]:
-    """
-    Create/merge a Person entity node based on extracted fields.
-    Returns the person name (used as canonical_text) or None.
-    """
-    name = clean_str(person_fields.get("name"))
-    if not name:
-        return None
+def extract_many(texts: List[str]) -> List[Dict[str, Dict[str, str]]]:
+    return EXTRACTOR.extract_many(texts)
 
-    # Map fields to properties
-    params = {
-        "name": name,
-        "dob": clean_str(person_fields.get("dob")),
-        "citizenship": clean_str(person_fields.get("citizenship")),
-        "place_of_birth": clean_str(person_fields.get("place_of_birth")),
-        "phone_number": clean_str(person_fields.get("phone_number")),
-        "address": clean_str(person_fields.get("address")),
-        "passport_number": clean_str(person_fields.get("passport_number")),
-        "flight_number": clean_str(person_fields.get("flight_number")),
-        "departure_location": clean_str(person_fields.get("departure_location")),
-        "arrival_location": clean_str(person_fields.get("arrival_location")),
-        "arrest_location": clean_str(person_fields.get("arrest_location")),
-        "arrival_date": clean_str(person_fields.get("arrival_date")),
-        "departure_date": clean_str(person_fields.get("departure_date")),
-        "date_generic": clean_str(person_fields.get("date_generic")),
-        "money": clean_str(person_fields.get("money")),
-        "license_plate": clean_str(person_fields.get("license_plate")),
-        "drivers_license": clean_str(person_fields.get("drivers_license")),
-        "residence_location": clean_str(person_fields.get("residence_location")),
-    }
 
-    cypher = """
-    MERGE (p:Entity:Person {entity_type: 'PERSON', canonical_text: $name})
-    ON CREATE SET
-      p.name               = $name,
-      p.dob                = $dob,
-      p.citizenship        = $citizenship,
-      p.place_of_birth     = $place_of_birth,
-      p.phone_number       = $phone_number,
-      p.address            = $address,
-      p.passport_number    = $passport_number,
-      p.flight_number      = $flight_number,
-      p.departure_location = $departure_location,
-      p.arrival_location   = $arrival_location,
-      p.arrest_location    = $arrest_location,
-      p.arrival_date       = $arrival_date,
-      p.departure_date     = $departure_date,
-      p.date_generic       = $date_generic,
-      p.money              = $money,
-      p.license_plate      = $license_plate,
-      p.drivers_license    = $drivers_license,
-      p.residence_location = $residence_location,
-      p.source             = 'structured_text',
-      p.created_at         = datetime(),
-      p.updated_at         = datetime()
-    ON MATCH SET
-      p.dob                = coalesce(p.dob, $dob),
-      p.citizenship        = coalesce(p.citizenship, $citizenship),
-      p.place_of_birth     = coalesce(p.place_of_birth, $place_of_birth),
-      p.phone_number       = coalesce(p.phone_number, $phone_number),
-      p.address            = coalesce(p.address, $address),
-      p.passport_number    = coalesce(p.passport_number, $passport_number),
-      p.flight_number      = coalesce(p.flight_number, $flight_number),
-      p.departure_location = coalesce(p.departure_location, $departure_location),
-      p.arrival_location   = coalesce(p.arrival_location, $arrival_location),
-      p.arrest_location    = coalesce(p.arrest_location, $arrest_location),
-      p.arrival_date       = coalesce(p.arrival_date, $arrival_date),
-      p.departure_date     = coalesce(p.departure_date, $departure_date),
-      p.date_generic       = coalesce(p.date_generic, $date_generic),
-      p.money              = coalesce(p.money, $money),
-      p.license_plate      = coalesce(p.license_plate, $license_plate),
-      p.drivers_license    = coalesce(p.drivers_license, $drivers_license),
-      p.residence_location = coalesce(p.residence_location, $residence_location),
-      p.updated_at         = datetime()
-    """
-    write(cypher, params)
-    return name
+# --- OPTIONAL NER STAGE (spaCy) ---
+# Enabled with `ner.enabled` in rules.yml. Runs one batched nlp.pipe over all rows in the
+# main process, alongside the regex extraction pool, and fills fields the regexes missed.
+SPACY_MODEL = rules.get("spacy_model", "en_core_web_sm")
+NER_CONFIG = rules.get("ner", {}) or {}
+USE_NER = bool(NER_CONFIG.get("enabled", False))
 
 
-def upsert_organization(org_fields: Dict[str, str]) -> Optional[str]:
-    name = clean_str(org_fields.get("name"))
-    if not name:
+def build_ner() -> Optional[NerExtractor]:
+    if not USE_NER:
         return None
-    address = clean_str(org_fields.get("address"))
+    return NerExtractor(
+        SPACY_MODEL,
+        labels=ENTITY_CONFIG.keys(),
+        batch_size=int(NER_CONFIG.get("batch_size", 256)),
+        n_process=int(NER_CONFIG.get("n_process", 1)),
+    )
 
-    params = {"name": name, "address": address}
-    cypher = """
-    MERGE (o:Entity:Organization {entity_type: 'ORG', canonical_text: $name})
-    ON CREATE SET
-      o.name       = $name,
-      o.address    = $address,
-      o.source     = 'structured_text',
-      o.created_at = datetime(),
-      o.updated_at = datetime()
-    ON MATCH SET
-      o.address    = coalesce(o.address, $address),
-      o.updated_at = datetime()
-    """
-    write(cypher, params)
-    return name
 
+def merge_ner(chunks: Iterable[List["ExtractedRow"]], entities: Iterable[Dict[str, List[str]]]):
+    """Zip extracted chunks with the NER stream (both in row order) and merge entities into the fields."""
+    entities = iter(entities)
+    fill_fields = NER_CONFIG.get("fill_fields", {})
+    for chunk in chunks:
+        for row in chunk:
+            merge_entities(row[4], row[5], next(entities), fill_fields)
+        yield chunk
 
-def upsert_location(name: str):
-    if not name:
-        return
-    params = {"name": name}
-    cypher = """
-    MERGE (l:Entity:Location {entity_type: 'GPE', canonical_text: $name})
-    ON CREATE SET
-      l.name       = $name,
-      l.source     = 'structured_text',
-      l.created_at = datetime(),
-      l.updated_at = datetime()
-    ON MATCH SET
-      l.updated_at = datetime()
-    """
-    write(cypher, params)
 
+# --- GRAPH UPSERTS (batched) ---
+# Statements and GraphBatch live in graph_batch.py (shared with descriptions_to_graph_generic.py).
+BATCH_SIZE = 1000
 
-def connect_record_to_person(record_id: str, person_name: str):
-    params = {"record_id": record_id, "name": person_name}
-    cypher = f"""
-    MATCH (r:{RECORD_LABEL} {{record_id: $record_id}})
-    MATCH (p:Entity:Person {{entity_type:'PERSON', canonical_text:$name}})
-    MERGE (r)-[:DESCRIBES]->(p)
-    """
-    write(cypher, params)
+# Locations and organizations already written in this run are not MERGEd again;
+# repeat sightings only refresh updated_at (see entity_cache.py).
+ENTITY_CACHE_SIZE = 100_000
+ENTITY_CACHE = EntityCache(ENTITY_CACHE_SIZE)
 
 
-def connect_person_to_org(person_name: str, org_name: str):
-    # generic association
-    params = {"pname": person_name, "oname": org_name}
-    cypher = """
-    MATCH (p:Entity:Person {entity_type:'PERSON', canonical_text:$pname})
-    MATCH (o:Entity:Organization {entity_type:'ORG', canonical_text:$oname})
-    MERGE (p)-[r:ASSOCIATED_WITH_ORG]->(o)
-    ON CREATE SET
-      r.source     = 'structured_text',
-      r.first_seen = datetime(),
-      r.last_seen  = datetime()
-    ON MATCH SET
-      r.last_seen  = datetime()
-    """
-    write(cypher, params)
+def new_batch(cache: Optional[EntityCache] = None) -> GraphBatch:
+    return GraphBatch(SCHEMA, cache if cache is not None else ENTITY_CACHE)
 
 
-def connect_person_works_for_org(person_name: str, org_name: str):
-    # more semantic employment relationship
-    params = {"pname": person_name, "oname": org_name}
-    cypher = """
-    MATCH (p:Entity:Person {entity_type:'PERSON', canonical_text:$pname})
-    MATCH (o:Entity:Organization {entity_type:'ORG', canonical_text:$oname})
-    MERGE (p)-[r:WORKS_FOR]->(o)
-    ON CREATE SET
-      r.source     = 'structured_text',
-      r.first_seen = datetime(),
-      r.last_seen  = datetime()
-    ON MATCH SET
-      r.last_seen  = datetime()
-    """
-    write(cypher, params)
-
-
-def connect_person_to_locations(person_name: str, person_fields: Dict[str, str]):
-    for field_key, rel_type in LOCATION_REL_MAP.items():
-        loc_name = clean_str(person_fields.get(field_key))
-        if not loc_name:
-            continue
-        upsert_location(loc_name)
-        params = {"pname": person_name, "loc_name": loc_name}
-        cypher = f"""
-        MATCH (p:Entity:Person {{entity_type:'PERSON', canonical_text:$pname}})
-        MATCH (l:Entity:Location {{entity_type:'GPE', canonical_text:$loc_name}})
-        MERGE (p)-[r:{rel_type}]->(l)
-        ON CREATE SET
-          r.source     = 'structured_text',
-          r.first_seen = datetime(),
-          r.last_seen  = datetime()
-        ON MATCH SET
-          r.last_seen  = datetime()
-        """
-        write(cypher, params)
-
-
-def create_same_flight_relationships():
+def touch_cached_entities(cache: Optional[EntityCache] = None) -> int:
+    """End of run: one write refreshing updated_at on every entity whose re-MERGE was skipped."""
+    return graph_batch.touch_cached_entities(driver, cache if cache is not None else ENTITY_CACHE)
+
+
+SAME_FLIGHT_BATCH = 5000
+
+
+def create_same_flight_relationships(person_names: Optional[Iterable[str]] = None):
     """
     Derived relationships between people who share the same flight_number.
+
+    Only pairs involving `person_names` (the persons touched by this load) are
+    derived: their flights are looked up, co-passengers are found through the
+    flight_number index and grouped per flight, so the cost follows the new data
+    rather than the square of the graph. `None` re-derives every flight.
     """
+    if person_names is None:
+        person_names = [
+            r["name"] for r in read("""
+            MATCH (p:Person)
+            WHERE p.flight_number IS NOT NULL
+            RETURN p.canonical_text AS name
+            """)
+        ]
+    names = sorted(set(person_names))
     cypher = """
-    MATCH (p1:Person), (p2:Person)
-    WHERE p1.flight_number IS NOT NULL
-      AND p1.flight_number = p2.flight_number
-      AND p1.canonical_text < p2.canonical_text
-    MERGE (p1)-[r:TRAVELED_SAME_FLIGHT]->(p2)
+    UNWIND $names AS name
+    MATCH (t:Entity:Person {entity_type:'PERSON', canonical_text: name})
+    WHERE t.flight_number IS NOT NULL
+    WITH t.flight_number AS flight, collect(t) AS touched
+    MATCH (p:Person {flight_number: flight})
+    WITH flight, touched, collect(p) AS passengers
+    UNWIND touched AS p1
+    UNWIND passengers AS p2
+    WITH p1, p2, touched
+    WHERE p1 <> p2
+      // a pair of two touched people is seen twice; keep one ordering
+      AND (NOT p2 IN touched OR p1.canonical_text < p2.canonical_text)
+    WITH CASE WHEN p1.canonical_text < p2.canonical_text THEN p1 ELSE p2 END AS a,
+         CASE WHEN p1.canonical_text < p2.canonical_text THEN p2 ELSE p1 END AS b
+    MERGE (a)-[r:TRAVELED_SAME_FLIGHT]->(b)
     ON CREATE SET
       r.source     = 'derived_same_flight',
       r.first_seen = datetime(),
@@ -377,49 +281,206 @@ def create_same_flight_relationships():
     ON MATCH SET
       r.last_seen  = datetime()
     """
-    write(cypher)
+    with driver.session() as s:
+        for i in range(0, len(names), SAME_FLIGHT_BATCH):
+            chunk = names[i:i + SAME_FLIGHT_BATCH]
+            s.execute_write(lambda tx: tx.run(cypher, names=chunk).consume())
+
+
+# --- PIPELINED LOAD ---
+def extract_chunk(rows: List[PlannedRow]) -> List[ExtractedRow]:
+    """Extraction task (runs in a worker process): planned rows -> extracted rows."""
+    out: List[ExtractedRow] = []
+    for record_id, row_index, description, content_hash in rows:
+        fields = extract_fields(description)
+        out.append((
+            record_id,
+            row_index,
+            description,
+            content_hash,
+            fields.get("person", {}),
+            fields.get("organization", {}),
+        ))
+    return out
+
+
+def iter_row_chunks(rows: List[PlannedRow], size: int):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def iter_extracted(rows: List[PlannedRow], workers: int):
+    """Yield extracted chunks in input order, keeping at most 2*workers tasks in flight."""
+    chunks = iter_row_chunks(rows, EXTRACT_CHUNK)
+    if workers <= 0:
+        for chunk in chunks:
+            yield extract_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(extract_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for fut in pending:
+            yield fut.result()
+
+
+class Progress:
+    """Single status line: extracted / written rows and throughput."""
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.extracted = 0
+        self.written = 0
+        self.start = time.perf_counter()
+        self._last = 0.0
+
+    def show(self, force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - self._last < 0.5:
+            return
+        self._last = now
+        rate = self.written / max(now - self.start, 1e-9)
+        sys.stdout.write(
+            f"\r  extracted {self.extracted}/{self.total} | written {self.written} | {rate:,.0f} rows/s"
+        )
+        sys.stdout.flush()
+
+
+def graph_writer(q: "queue.Queue", progress: Progress, errors: List[BaseException], touched: Set[str]):
+    """
+    Writer stage: drain extracted chunks into BATCH_SIZE graph batches on one session.
+    Names of the persons written are collected in `touched` for incremental derivations.
+    """
+    done = False  # sentinel taken off the queue; draining after that would block forever
+    try:
+        with driver.session() as session:
+            writer = BatchWriter(session, new_batch, BATCH_SIZE, touched)
+            while True:
+                chunk = q.get()
+                if chunk is None:
+                    done = True
+                    break
+                writer.add_all(chunk)
+                progress.written = writer.written
+                progress.show()
+            writer.flush()
+            progress.written = writer.written
+    except BaseException as e:  # surfaced by the producer
+        errors.append(e)
+        # keep draining so the producer never blocks on a full queue
+        while not done and q.get() is not None:
+            pass
+
+
+def load_graph(rows: List[PlannedRow], workers: int = EXTRACT_WORKERS,
+               ner: Optional[NerExtractor] = None) -> Set[str]:
+    """
+    Overlap CPU-bound extraction (process pool) with network-bound graph writes (writer thread).
+    With `ner`, spaCy entities are merged into each chunk before it is written.
+    Returns the names of the persons written.
+    """
+    if PROFILE_RULES:
+        workers = 0  # rule timings are only collected in this process
+    progress = Progress(total=len(rows))
+    q: "queue.Queue" = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+    errors: List[BaseException] = []
+    touched: Set[str] = set()
+    writer = threading.Thread(target=graph_writer, args=(q, progress, errors, touched), daemon=True)
+    writer.start()
+    try:
+        extracted = iter_extracted(rows, workers)
+        if ner is not None:
+            extracted = merge_ner(extracted, ner.iter_entities(r[2] for r in rows))
+        for chunk in extracted:
+            if errors:
+                break
+            progress.extracted += len(chunk)
+            if DEBUG_RECORDS:
+                for record_id, _, description, _, person_fields, org_fields in chunk:
+                    print(f"[Record {record_id}]")
+                    print("  description:", description)
+                    print("  person_fields:", person_fields)
+                    print("  org_fields:", org_fields)
+                    print("")
+            q.put(chunk)  # blocks when the writer falls behind (backpressure)
+    finally:
+        q.put(None)
+        writer.join()
+    progress.show(force=True)
+    print("")
+    if errors:
+        raise errors[0]
+    return touched
 
 
 # --- MAIN PIPELINE ---
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Load descriptions into Neo4j using rules.yml.")
+    ap.add_argument("--drop-legacy-records", action="store_true",
+                    help="One-off migration before loading: delete Records with positional DESC_<n> ids "
+                         "(written before content hashes were stored).")
+    ap.add_argument("--profile", action="store_true",
+                    help="Profile the load: PREFIX.speedscope.json with pyinstrument installed, else "
+                         "PREFIX.pstats (cProfile). Extraction runs in-process.")
+    ap.add_argument("--profile-out", default="graph_profile", metavar="PREFIX",
+                    help="--profile output path without extension. Default: graph_profile")
+    ap.add_argument("--trace", default=None, metavar="PATH",
+                    help="Record tracing spans (extract_fields, write, flush_batch) as Chrome trace JSON. "
+                         "Extraction runs in-process.")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    # Profiles and spans only see this process, so extraction leaves the worker pool
+    workers = 0 if (args.profile or args.trace) else EXTRACT_WORKERS
+    if args.trace:
+        profiling.enable_tracing()
+    try:
+        if args.profile:
+            profiling.run_profiled(lambda: run(workers, args.drop_legacy_records), args.profile_out)
+        else:
+            run(workers, args.drop_legacy_records)
+    finally:
+        if args.trace:
+            n = profiling.write_chrome_trace(args.trace)
+            print(f"{n} trace events written to {args.trace} (open in chrome://tracing or ui.perfetto.dev)")
+            print(profiling.summarize_spans())
+
+
+def run(workers: int = EXTRACT_WORKERS, drop_legacy: bool = False):
     print("=== Ensuring schema ===")
     ensure_schema()
 
+    if drop_legacy:
+        print("=== Dropping legacy records ===")
+        print(f"{graph_batch.drop_legacy_records(driver, SCHEMA)} records without content_hash deleted")
+
     print("=== Loading Excel ===")
     df = load_descriptions(EXCEL_PATH)
 
-    print("=== Processing rows ===")
-    for idx, row in df.iterrows():
-        description = clean_str(row["description"])
-        if not description:
-            continue
-
-        record_id = f"{RECORD_ID_PREFIX}{idx+1}"
-        upsert_record(record_id, idx + 1, description)
+    print("=== Checking for unchanged records ===")
+    rows = skip_unchanged(plan_records(df))
 
-        fields = extract_fields(description)
-        person_fields = fields.get("person", {})
-        org_fields = fields.get("organization", {})
-
-        person_name = upsert_person(person_fields) if person_fields else None
-        org_name = upsert_organization(org_fields) if org_fields else None
-
-        if person_name:
-            connect_record_to_person(record_id, person_name)
-            connect_person_to_locations(person_name, person_fields)
-            if org_name:
-                connect_person_to_org(person_name, org_name)
-                connect_person_works_for_org(person_name, org_name)
-
-        # Debug
-        print(f"[Record {record_id}]")
-        print("  description:", description)
-        print("  person_fields:", person_fields)
-        print("  org_fields:", org_fields)
-        print("")
+    print("=== Processing rows ===")
+    ner = build_ner()
+    touched = load_graph(rows, workers=workers, ner=ner)
+    if ner is not None:
+        r = ner.report()
+        print(f"NER ({r['model']}): {r['docs']} docs in {r['seconds']}s ({r['docs_per_sec']:,} docs/sec, "
+              f"batch_size={r['batch_size']}, n_process={r['n_process']})")
+    refreshed = touch_cached_entities()
+    stats = ENTITY_CACHE.stats()
+    print(f"Entities: {stats['written']} written, {stats['skipped']} repeats skipped, {refreshed} refreshed")
 
     print("=== Creating derived relationships (same flight) ===")
-    create_same_flight_relationships()
+    create_same_flight_relationships(touched)
+
+    if PROFILE_RULES:
+        print("=== Rule report ===")
+        print(EXTRACTOR.format_report())
 
     print("=== Sample graph ===")
     people = read("""
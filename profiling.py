@@ -0,0 +1,160 @@
+"""
+profiling.py
+Opt-in profiling and tracing for ingest and search runs.
+
+- run_profiled(fn, out): runs `fn` under a sampling profiler when pyinstrument is installed
+  (writes `<out>.speedscope.json`, open it at https://www.speedscope.app), otherwise under
+  cProfile (writes `<out>.pstats` and prints the top functions by cumulative time).
+- span(name) / @traced(name): tracing spans around hot code. They cost one flag check
+  while tracing is off; with enable_tracing() every span is recorded and
+  write_chrome_trace(path) emits Chrome trace JSON (chrome://tracing, Perfetto).
+
+Both profilers only see the thread that starts them; background threads (graph writer,
+parallel bulk workers) show up in the trace instead, one row per thread id. Spans are
+collected per process: work done in extraction worker processes is not traced.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+_enabled = False
+_events: List[Dict[str, Any]] = []
+_origin_ns = time.perf_counter_ns()
+
+
+class _NullSpan:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: Dict[str, Any]) -> None:
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc: Any) -> None:
+        end = time.perf_counter_ns()
+        event = {
+            "name": self.name,
+            "ph": "X",
+            "ts": (self.start - _origin_ns) / 1000.0,
+            "dur": (end - self.start) / 1000.0,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if self.args:
+            event["args"] = self.args
+        _events.append(event)  # list.append is atomic; spans may come from several threads
+
+
+def enable_tracing(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+
+def tracing_enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, **args: Any):
+    """Context manager timing a block as one trace event (a shared no-op while tracing is off)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator form of span(); the span is named after the function unless `name` is given."""
+    def wrap(fn: Callable[..., T]) -> Callable[..., T]:
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def inner(*a: Any, **kw: Any) -> T:
+            if not _enabled:
+                return fn(*a, **kw)
+            with _Span(label, {}):
+                return fn(*a, **kw)
+
+        return inner
+
+    return wrap
+
+
+def write_chrome_trace(path: str) -> int:
+    """Write the recorded spans as Chrome trace JSON; returns the number of events."""
+    events = list(_events)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
+
+
+def summarize_spans(top: int = 15) -> str:
+    """Total time and call count per span name, slowest first."""
+    totals: Dict[str, List[float]] = {}
+    for e in list(_events):
+        t = totals.setdefault(e["name"], [0.0, 0])
+        t[0] += e["dur"]
+        t[1] += 1
+    rows = sorted(totals.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    lines = [f"{'span':32} {'calls':>9} {'total_ms':>11} {'avg_us':>9}"]
+    for span_name, (dur_us, calls) in rows:
+        lines.append(f"{span_name:32} {calls:>9} {dur_us / 1000:>11.1f} {dur_us / calls:>9.1f}")
+    return "\n".join(lines)
+
+
+def run_profiled(fn: Callable[[], T], out: str, sampler: str = "auto") -> T:
+    """
+    Run `fn` under a profiler and write the profile next to `out`.
+    sampler: "auto" (pyinstrument if installed, else cProfile), "sampling" or "cprofile".
+    """
+    if sampler in ("auto", "sampling"):
+        try:
+            from pyinstrument import Profiler
+            from pyinstrument.renderers import SpeedscopeRenderer
+        except ImportError:
+            if sampler == "sampling":
+                raise ImportError("Sampling profiles need pyinstrument: pip install pyinstrument")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                return fn()
+            finally:
+                profiler.stop()
+                path = f"{out}.speedscope.json"
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(profiler.output(SpeedscopeRenderer()))
+                print(f"[INFO] Sampling profile written to {path} (open with https://www.speedscope.app)")
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn()
+    finally:
+        profiler.disable()
+        path = f"{out}.pstats"
+        profiler.dump_stats(path)
+        print(f"[INFO] cProfile stats written to {path} (python -m pstats {path}); top functions:")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
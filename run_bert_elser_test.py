@@ -1,10 +1,15 @@
 # run_bert_elser_test.py
-# One-shot or interactive semantic (ELSER+BM25) or BM25-only search.
+# One-shot or interactive semantic (ELSER+BM25) or BM25-only search,
+# or `serve` to expose search over a local HTTP JSON API,
+# or `export` / `restore` an index snapshot (sources + ELSER tokens, no re-inference).
 # Uses bert_elser_pipeline.BertDescriptionElser
 
 import sys
+import time
+import threading
 from pathlib import Path
 import argparse
+from typing import Any, Callable, Optional
 import pandas as pd
 
 # Ensure we can import the class module sitting next to this file
@@ -12,11 +17,158 @@ HERE = Path(__file__).resolve().parent
 if str(HERE) not in sys.path:
     sys.path.insert(0, str(HERE))
 
-from bert_elser_pipeline import BertDescriptionElser  # noqa: E402
+import profiling  # noqa: E402
+from bert_elser_pipeline import BertDescriptionElser, read_table  # noqa: E402
 
+PREVIEW_ROWS = 3
 
-def ensure_indexed(pipe: BertDescriptionElser, file_path: str, reindex: bool) -> None:
-    """Create mapping/pipeline and index the provided file if requested or if index is empty."""
+
+def parse_filter_fields(specs) -> dict:
+    """['status:keyword', 'amount:double', 'country'] -> {'status': 'keyword', ...} (default keyword)."""
+    out = {}
+    for spec in specs or []:
+        col, _, typ = spec.partition(":")
+        out[col.strip()] = (typ.strip() or "keyword")
+    return out
+
+
+def parse_search_filters(where, since: Optional[str], until: Optional[str], has) -> dict:
+    """CLI flags -> semantic_search filters. 'col=a' is a term, 'col=a,b' a terms filter."""
+    filters = {}
+    for spec in where or []:
+        col, sep, val = spec.partition("=")
+        if not sep:
+            raise SystemExit(f"--where expects COL=VALUE, got {spec!r}")
+        vals = [v.strip() for v in val.split(",") if v.strip()]
+        if not col.strip() or not vals:
+            raise SystemExit(f"--where expects COL=VALUE with a non-empty value, got {spec!r}")
+        filters[col.strip()] = vals if len(vals) > 1 else vals[0]
+    if since or until:
+        filters["timestamp"] = {k: v for k, v in (("gte", since), ("lt", until)) if v}
+    if has:
+        filters["_exists"] = list(has)
+    return filters
+
+
+def check_text_column(df: pd.DataFrame, col: str) -> None:
+    """Fail unless `col` exists and holds at least one non-blank value."""
+    if col not in df.columns:
+        raise SystemExit(f"Column '{col}' not found. Available: {list(df.columns)}")
+    if not df[col].dropna().astype(str).str.strip().ne("").any():
+        raise SystemExit(f"Column '{col}' has no text to index.")
+
+
+def print_preview(df: pd.DataFrame, col: str) -> None:
+    """Validate the text column and show the first rows to help catch typos early."""
+    if col not in df.columns:
+        raise SystemExit(f"Column '{col}' not found. Available: {list(df.columns)}")
+    print(f"\n=== DATA PREVIEW (first {PREVIEW_ROWS} rows) ===")
+    print(df.head(PREVIEW_ROWS))
+    print("\n=== COLUMNS ===")
+    print(list(df.columns))
+
+
+class Debouncer:
+    """Call `fn(value)` only once input has been idle for `delay_s` seconds."""
+
+    def __init__(self, fn: Callable[[str], None], delay_s: float) -> None:
+        self.fn = fn
+        self.delay_s = delay_s
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def push(self, value: str) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay_s, self.fn, args=(value,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+def _read_key() -> str:
+    """Read a single keystroke without waiting for Enter (Windows and POSIX terminals)."""
+    try:
+        import msvcrt  # type: ignore
+        return msvcrt.getwch()
+    except ImportError:
+        import termios
+        import tty
+        fd = sys.stdin.fileno()
+        old = termios.tcgetattr(fd)
+        try:
+            tty.setraw(fd)
+            return sys.stdin.read(1)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old)
+
+
+def typeahead_prompt(pipe: BertDescriptionElser, debounce_ms: int, size: int = 5) -> Optional[str]:
+    """
+    Keystroke-level prompt: show prefix suggestions (no ELSER) once typing pauses for
+    `debounce_ms`. Returns the text on Enter, or None on Esc/Ctrl-C.
+    """
+    buf = ""
+    out_lock = threading.Lock()
+
+    def redraw() -> None:
+        sys.stdout.write("\r\x1b[Ktype> " + buf)
+        sys.stdout.flush()
+
+    def show(prefix: str) -> None:
+        try:
+            hits = pipe.suggest(prefix, size=size)
+        except Exception as e:
+            lines = [f"  (suggest failed: {e})"]
+        else:
+            texts = hits[pipe.description_col].tolist() if pipe.description_col in hits.columns else []
+            lines = [f"  {str(t)[:100]}" for t in texts] or ["  (no suggestions)"]
+        with out_lock:
+            if prefix != buf:  # stale: user kept typing
+                return
+            sys.stdout.write("\r\x1b[K" + "\r\n".join(lines) + "\r\n")
+            redraw()
+
+    debouncer = Debouncer(show, debounce_ms / 1000.0)
+    print("Type-ahead: suggestions appear as you type. Enter = full search, Esc = back.")
+    redraw()
+    try:
+        while True:
+            ch = _read_key()
+            with out_lock:
+                if ch in ("\r", "\n"):
+                    sys.stdout.write("\r\n")
+                    return buf.strip() or None
+                if ch in ("\x1b", "\x03", "\x04"):
+                    sys.stdout.write("\r\n")
+                    return None
+                if ch in ("\x08", "\x7f"):
+                    buf = buf[:-1]
+                elif ch.isprintable():
+                    buf += ch
+                else:
+                    continue
+                redraw()
+            if buf.strip():
+                debouncer.push(buf)
+            else:
+                debouncer.cancel()
+    finally:
+        debouncer.cancel()
+
+
+def ensure_indexed(pipe: BertDescriptionElser, file_path: str, reindex: bool, preview: bool = True) -> None:
+    """
+    Create mapping/pipeline and index the provided file if requested or if index is empty.
+    The file is read in full only when ingestion happens; reusing an index reads just the
+    preview rows (or nothing at all with preview=False).
+    """
     count = 0
     if pipe.es.indices.exists(index=pipe.index_name):
         try:
@@ -25,53 +177,190 @@ def ensure_indexed(pipe: BertDescriptionElser, file_path: str, reindex: bool) ->
             count = 0
 
     if reindex or count == 0:
-        if pipe.es.indices.exists(index=pipe.index_name):
-            pipe.es.indices.delete(index=pipe.index_name, ignore_unavailable=True)
+        # Read (and validate) before dropping the old index so a typo never wipes it
+        df = read_table(file_path)
+        check_text_column(df, pipe.description_col)
+        if preview:
+            print_preview(df, pipe.description_col)
+        pipe.drop_index()
         pipe.ensure_index()
         pipe.ensure_pipeline()  # no-op if ML unavailable
-        pipe.bulk_index_file(file_path, id_field=None)
+        pipe.bulk_index_dataframe(df, id_field=None)
         count = pipe.es.count(index=pipe.index_name)["count"]
         print(f"[INFO] Indexed docs: {count}")
+        try:
+            st = pipe.index_stats()
+            print(
+                f"[INFO] Index size: {st['store_bytes'] / 1e6:.1f} MB, mapped fields: {st['mapped_fields']}, "
+                f"dynamic: {st['dynamic']}, throughput: {st.get('docs_per_sec')} docs/s"
+            )
+        except Exception:
+            pass
+        if pipe.dedup:
+            st = pipe.last_ingest_stats
+            print(
+                f"[INFO] Dedup ({st.get('dedup')}): {st.get('rows')} rows -> {st.get('groups')} groups "
+                f"({st.get('exact_duplicates')} exact, {st.get('near_duplicates')} near); "
+                f"inference calls avoided: {st.get('inference_calls_avoided')}"
+            )
+            if st.get("dedup_fallback"):
+                print(f"[WARN] Client-side inference unavailable, used the ingest pipeline: {st['dedup_fallback']}")
+        st = pipe.last_ingest_stats
+        if st.get("inference_requests"):
+            print(f"[INFO] Inference: {st['inference_requests']} request(s), {st.get('truncated_inputs', 0)} truncated input(s)")
+        if st.get("chunking_fallback"):
+            print(f"[WARN] Passage chunking skipped, used the ingest pipeline (searches also query "
+                  f"ml.description_tokens): {st['chunking_fallback']}")
     else:
+        if preview:
+            print_preview(read_table(file_path, nrows=PREVIEW_ROWS), pipe.description_col)
+        if pipe.typeahead:
+            # Adds the subfield if missing; only documents indexed afterwards populate it
+            pipe.ensure_index()
+            print("[INFO] Type-ahead subfield ensured; use --reindex if existing docs predate it.")
         print(f"[INFO] Using existing index '{pipe.index_name}' with {count} docs.")
 
 
 def main():
     ap = argparse.ArgumentParser(description="ELSER or BM25 search without hard-coded queries.")
-    ap.add_argument("--file", "-f", required=True, help="Path to .xlsx/.xls/.csv to index and search.")
+    ap.add_argument("mode", nargs="?", choices=("search", "serve", "export", "restore"), default="search",
+                    help="'search' (default): one-shot/interactive CLI. 'serve': long-running HTTP JSON API. "
+                         "'export' / 'restore': dump the index to --snapshot, or load it back without inference.")
+    ap.add_argument("--file", "-f", default=None, help="Path to .xlsx/.xls/.csv to index and search (search and serve).")
     ap.add_argument("--col", "-c", default="Description", help="Text column to index and search. Default: Description")
     ap.add_argument("--query", "-q", default=None, help="One-shot query text. If omitted, enters interactive mode.")
     ap.add_argument("--reindex", action="store_true", help="Recreate index and re-ingest the file.")
     ap.add_argument("--index-name", default="chat_elser_description_only", help="Elasticsearch index name.")
     ap.add_argument("--pipeline-id", default="elser_v2_description_only", help="Elasticsearch ingest pipeline id.")
-    ap.add_argument("--es-url", default="http://localhost:9200", help="Elasticsearch URL.")
+    ap.add_argument("--es-url", default="http://localhost:9200", help="Elasticsearch URL. Comma-separate several nodes to round-robin across them.")
     ap.add_argument("--es-user", default="elastic", help="Elasticsearch username.")
     ap.add_argument("--es-pass", default="changeme", help="Elasticsearch password.")
     ap.add_argument("--model-id", default=".elser_model_2_linux-x86_64", help="ELSER model id.")
     ap.add_argument("--size", type=int, default=10, help="Number of hits to return. Default: 10")
     ap.add_argument("--bm25-only", action="store_true", help="Force BM25-only (ignore ELSER/text_expansion).")
+    ap.add_argument("--sniff", action="store_true", help="Discover cluster nodes on start and use them all.")
+    ap.add_argument("--sniff-on-failure", action="store_true", help="Re-discover cluster nodes after a node fails.")
+    ap.add_argument("--ingest-threads", type=int, default=1, help="Parallel bulk workers during ingestion. Default: 1")
+    ap.add_argument("--connections-per-node", type=int, default=None, help="HTTP connection pool size per node. Default: sized to --ingest-threads")
+    ap.add_argument("--http-compress", action="store_true", help="Gzip request bodies (useful for large bulk payloads).")
+    ap.add_argument("--no-preview", action="store_true", help="Skip the data preview (the file is not opened at all when the index is reused).")
+    ap.add_argument("--typeahead", choices=("search_as_you_type", "index_prefixes"), default=None,
+                    help="Index a prefix subfield on --col for cheap type-ahead suggestions (:type in interactive mode).")
+    ap.add_argument("--debounce-ms", type=int, default=150, help="Type-ahead: idle time before suggesting. Default: 150")
+    ap.add_argument("--dynamic", choices=("true", "false", "strict", "runtime"), default="true",
+                    help="Mapping policy for undeclared columns. Default: true (dynamic text+keyword)")
+    ap.add_argument("--filter-field", action="append", default=[], metavar="COL[:TYPE]",
+                    help="Declare a filterable column (keyword, long, double, date, boolean...). Repeatable.")
+    ap.add_argument("--display-field", action="append", default=[], metavar="COL",
+                    help="Declare a display-only column (stored in _source, not indexed). Repeatable.")
+    ap.add_argument("--sort-by-timestamp", action="store_true", help="Create the index sorted by timestamp (desc).")
+    ap.add_argument("--where", action="append", default=[], metavar="COL=VALUE[,VALUE...]",
+                    help="Filter hits on a column value (filter context, no scoring). Repeatable.")
+    ap.add_argument("--since", default=None, help="Only hits with timestamp >= this date.")
+    ap.add_argument("--until", default=None, help="Only hits with timestamp < this date.")
+    ap.add_argument("--has", action="append", default=[], metavar="COL", help="Only hits where COL exists. Repeatable.")
+    ap.add_argument("--newest-first", action="store_true", help="Order hits by timestamp instead of relevance.")
+    ap.add_argument("--partition", choices=("monthly",), default=None,
+                    help="Time-partition the index by document timestamp (<index>-YYYY.MM behind an <index> alias).")
+    ap.add_argument("--retain-months", type=int, default=None,
+                    help="With --partition: drop monthly partitions older than this many months.")
+    ap.add_argument("--dedup", choices=("reuse", "collapse"), default=None,
+                    help="Skip ELSER inference for near-duplicate descriptions: reuse one token map per group, "
+                         "or collapse each group into one document with duplicate_count.")
+    ap.add_argument("--dedup-threshold", type=float, default=0.9,
+                    help="Estimated Jaccard similarity for near-duplicates. Default: 0.9")
+    ap.add_argument("--chunk", action="store_true",
+                    help="Split long descriptions into overlapping passages (nested ELSER tokens, max-passage scoring).")
+    ap.add_argument("--passage-words", type=int, default=200, help="Words per passage with --chunk. Default: 200")
+    ap.add_argument("--passage-overlap", type=int, default=50, help="Overlapping words between passages. Default: 50")
+    ap.add_argument("--entity-rules", default=None, metavar="RULES_YML",
+                    help="Extract entities with these regex rules during ingest and index them as keyword fields.")
+    ap.add_argument("--facet", action="append", default=[], metavar="FIELD",
+                    help="With --entity-rules: print the top values of FIELD (e.g. flight_number, locations) for each query. Repeatable.")
+    ap.add_argument("--facet-sample", type=int, default=None, metavar="N",
+                    help="Count facets over the N best hits per shard instead of every match.")
+    ap.add_argument("--graph-context", action="store_true",
+                    help="Attach each hit's Neo4j neighborhood (persons, organizations, locations), one query per page.")
+    ap.add_argument("--graph-rules", default="rules.yml", help="Graph loader rules (record id settings). Default: rules.yml")
+    ap.add_argument("--neo4j-uri", default="neo4j://localhost:7687", help="Neo4j URI for --graph-context.")
+    ap.add_argument("--neo4j-user", default="neo4j", help="Neo4j username.")
+    ap.add_argument("--neo4j-pass", default="neo4j123", help="Neo4j password.")
+    ap.add_argument("--host", default="127.0.0.1", help="serve: address to bind. Default: 127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080, help="serve: port to listen on. Default: 8080")
+    ap.add_argument("--workers", type=int, default=8, help="serve: concurrent backend searches. Default: 8")
+    ap.add_argument("--snapshot", default=None, metavar="PATH",
+                    help="export/restore: snapshot file (.ndjson.gz, .jsonl.gz, .ndjson or .parquet).")
+    ap.add_argument("--export-slices", type=int, default=None,
+                    help="export: parallel point-in-time slices. Default: --ingest-threads")
+    ap.add_argument("--profile", action="store_true",
+                    help="Profile the run: PREFIX.speedscope.json with pyinstrument installed, else PREFIX.pstats (cProfile).")
+    ap.add_argument("--profile-out", default="profile", metavar="PREFIX",
+                    help="--profile output path without extension. Default: profile")
+    ap.add_argument("--trace", default=None, metavar="PATH",
+                    help="Record tracing spans (ingest actions, date parsing, ES searches) as Chrome trace JSON.")
     args = ap.parse_args()
 
-    # Preview columns to help catch typos early
+    if args.trace:
+        profiling.enable_tracing()
+    try:
+        if args.profile:
+            profiling.run_profiled(lambda: run(args), args.profile_out)
+        else:
+            run(args)
+    finally:
+        if args.trace:
+            n = profiling.write_chrome_trace(args.trace)
+            print(f"[INFO] {n} trace events written to {args.trace} (open in chrome://tracing or ui.perfetto.dev)")
+            print(profiling.summarize_spans())
+
+
+def run_snapshot(pipe: BertDescriptionElser, args: argparse.Namespace) -> None:
+    """export: dump the index to --snapshot. restore: bulk-load it (--reindex drops the index first)."""
+    if args.mode == "export":
+        stats = pipe.export_index(args.snapshot, slices=args.export_slices)
+        print(f"[INFO] Exported {stats['docs']} docs from '{pipe.index_name}' to {args.snapshot} "
+              f"({stats['format']}, {stats['bytes']:,} bytes) in {stats['seconds']}s with {stats['slices']} slice(s), "
+              f"{stats['docs_per_sec']} docs/s")
+        return
+    if args.reindex:
+        pipe.drop_index()
+    pipe.restore_index(args.snapshot)
+    stats = pipe.last_ingest_stats
+    print(f"[INFO] Restored {stats['indexed_rows']} docs into '{pipe.index_name}' in {stats['ingest_seconds']}s "
+          f"({stats['docs_per_sec']} docs/s, no inference)")
+
+
+def run(args: argparse.Namespace) -> None:
+    t_start = time.perf_counter()
+
     fp = args.file
-    if not Path(fp).exists():
+    if args.mode in ("export", "restore"):
+        if not args.snapshot:
+            raise SystemExit(f"{args.mode} requires --snapshot PATH.")
+        if args.mode == "restore" and not Path(args.snapshot).exists():
+            raise SystemExit(f"Snapshot not found: {args.snapshot}")
+    elif not fp:
+        raise SystemExit("--file is required for search and serve.")
+    elif not Path(fp).exists():
         raise SystemExit(f"Input file not found: {fp}")
-
-    if fp.lower().endswith((".xlsx", ".xls")):
-        df_preview = pd.read_excel(fp)
-    elif fp.lower().endswith(".csv"):
-        df_preview = pd.read_csv(fp)
-    else:
+    elif not fp.lower().endswith((".xlsx", ".xls", ".csv")):
         raise SystemExit("Only .xlsx, .xls, or .csv are supported.")
 
-    if args.col not in df_preview.columns:
-        raise SystemExit(f"Column '{args.col}' not found. Available: {list(df_preview.columns)}")
+    graph_context = None
+    if args.graph_context:
+        from graph_context import GraphContext
+
+        graph_context = GraphContext(args.neo4j_uri, args.neo4j_user, args.neo4j_pass, rules_path=args.graph_rules)
+    try:
+        _run(args, graph_context, t_start)
+    finally:
+        if graph_context is not None:
+            graph_context.close()
 
-    print("\n=== DATA PREVIEW (first 3 rows) ===")
-    print(df_preview.head(3))
-    print("\n=== COLUMNS ===")
-    print(list(df_preview.columns))
 
+def _run(args: argparse.Namespace, graph_context: Optional[Any], t_start: float) -> None:
+    """Everything after argument checks; `run` owns the Neo4j driver of the graph context."""
+    fp = args.file
     pipe = BertDescriptionElser(
         es_url=args.es_url,
         es_user=args.es_user,
@@ -81,17 +370,69 @@ def main():
         model_id=args.model_id,
         description_col=args.col,
         use_ml=(not args.bm25_only),  # allow forcing BM25-only
+        sniff_on_start=args.sniff,
+        sniff_on_node_failure=args.sniff_on_failure,
+        # serve: keep one warm keep-alive connection per search worker
+        connections_per_node=args.connections_per_node or (args.workers + 2 if args.mode == "serve" else None),
+        http_compress=args.http_compress,
+        ingest_threads=args.ingest_threads,
+        typeahead=args.typeahead,
+        dynamic={"true": True, "false": False}.get(args.dynamic, args.dynamic),
+        filter_fields=parse_filter_fields(args.filter_field),
+        display_fields=args.display_field,
+        sort_by_timestamp=args.sort_by_timestamp,
+        partition=args.partition,
+        dedup=args.dedup,
+        dedup_threshold=args.dedup_threshold,
+        chunking=args.chunk,
+        passage_words=args.passage_words,
+        passage_overlap=args.passage_overlap,
+        entity_rules=args.entity_rules,
+        graph_context=graph_context,
     )
+    if args.facet and not args.entity_rules:
+        raise SystemExit("--facet requires --entity-rules.")
+
+    if args.mode in ("export", "restore"):
+        run_snapshot(pipe, args)
+        print(f"[INFO] Took {time.perf_counter() - t_start:.2f}s")
+        return
 
     # Back-compat shim: safe no-op that ensures pipeline if ML requested
     pipe.ensure_ready()
-    ensure_indexed(pipe, fp, reindex=args.reindex)
+    ensure_indexed(pipe, fp, reindex=args.reindex, preview=(not args.no_preview))
+    if args.retain_months is not None:
+        if not args.partition:
+            raise SystemExit("--retain-months requires --partition.")
+        today = pd.Timestamp.today()
+        cutoff = (today - pd.DateOffset(months=args.retain_months)).replace(day=1)
+        dropped = pipe.drop_partitions_before(cutoff.to_pydatetime())
+        print(f"[INFO] Retention: dropped {len(dropped)} partition(s) before {cutoff:%Y-%m}: {dropped}")
+    print(f"[INFO] Startup took {time.perf_counter() - t_start:.2f}s")
+
+    if args.mode == "serve":
+        from search_service import SearchServer
+
+        SearchServer(
+            pipe,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            default_size=args.size,
+            default_hybrid=(not args.bm25_only),
+        ).serve_until_signalled()
+        return
+
+    filters = parse_search_filters(args.where, args.since, args.until, args.has)
 
     def do_query(q: str):
         hits = pipe.semantic_search(
             question=q,
             size=args.size,
             hybrid=(not args.bm25_only),  # BM25 always; add ELSER if allowed and available
+            filters=filters or None,
+            newest_first=args.newest_first,
+            with_graph=args.graph_context,
         )
         if hits.empty:
             print("(no matches)")
@@ -103,6 +444,21 @@ def main():
             if "timestamp" in hits.columns:
                 cols.append("timestamp")
             print(hits[cols] if set(cols).issubset(hits.columns) else hits)
+            if "graph" in hits.columns:
+                for i, hood in enumerate(hits["graph"]):
+                    if not hood:
+                        print(f"  [{i}] (not in graph)")
+                        continue
+                    people = ", ".join(p["name"] for p in hood["persons"]) or "-"
+                    orgs = ", ".join(f"{o['name']} ({o['rel']})" for o in hood["organizations"]) or "-"
+                    locs = ", ".join(f"{l['name']} ({l['rel']})" for l in hood["locations"]) or "-"
+                    print(f"  [{i}] person: {people} | organizations: {orgs} | locations: {locs}")
+        if args.facet:
+            for name, buckets in pipe.facets(
+                q, fields=args.facet, filters=filters or None,
+                hybrid=(not args.bm25_only), sample_size=args.facet_sample,
+            ).items():
+                print(f"  {name}: " + (", ".join(f"{b['value']} ({b['count']})" for b in buckets) or "-"))
 
     if args.query:
         print(f"\n=== SEARCH RESULTS for: {args.query!r} ===")
@@ -110,7 +466,7 @@ def main():
     else:
         # Interactive loop
         print("\nInteractive mode. Type your query and press Enter.")
-        print("Commands: :quit to exit, :help for help.\n")
+        print("Commands: :quit to exit, :type for type-ahead, :help for help.\n")
         while True:
             try:
                 q = input("query> ").strip()
@@ -123,8 +479,15 @@ def main():
                 print("Exiting.")
                 break
             if q in {":help", "help", "?"}:
-                print("Enter any text to search. Use :quit to exit.")
+                print("Enter any text to search. Use :type for type-ahead suggestions, :quit to exit.")
                 continue
+            if q == ":type":
+                if not sys.stdin.isatty():
+                    print("Type-ahead needs an interactive terminal.")
+                    continue
+                q = typeahead_prompt(pipe, args.debounce_ms)
+                if not q:
+                    continue
             print(f"\n=== SEARCH RESULTS for: {q!r} ===")
             do_query(q)
             print("")
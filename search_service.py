@@ -0,0 +1,332 @@
+"""
+search_service.py
+Long-running HTTP JSON front end for BertDescriptionElser.semantic_search.
+
+Design:
+- One warm process, one Elasticsearch client (pooled keep-alive connections).
+- Searches run on a bounded worker pool; HTTP handler threads only parse and wait.
+- Identical in-flight queries are coalesced: concurrent duplicates share one backend call.
+- GET /health reports liveness; SIGINT/SIGTERM drain in-flight work and stop cleanly.
+
+Endpoints:
+  GET  /health
+  GET  /search?q=<text>&size=10&hybrid=true
+  POST /search   {"query": "<text>", "size": 10, "hybrid": true, "fields": [...],
+                  "filters": {"timestamp": {"gte": "2024-01-01"}, "country": "KE"}, "newest_first": false,
+                  "graph": false}            (graph: attach Neo4j neighborhoods, needs a graph context)
+  GET  /suggest?q=<prefix>&size=5        (lexical type-ahead, no ELSER)
+  POST /facets   {"query": "<text>", "fields": ["flight_number"], "size": 10, "filters": {...},
+                  "sample_size": 200}        (needs entity extraction, see entity_rules)
+"""
+
+from __future__ import annotations
+
+import json
+import signal
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from bert_elser_pipeline import BertDescriptionElser
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """DataFrame -> JSON-safe list of dicts (NaN becomes null)."""
+    if df.empty:
+        return []
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def _as_bool(v: Any, default: bool = True) -> bool:
+    if v is None:
+        return default
+    if isinstance(v, bool):
+        return v
+    return str(v).strip().lower() not in ("0", "false", "no", "off")
+
+
+MAX_SIZE = 10000  # Elasticsearch's default index.max_result_window
+
+
+def _as_int(v: Any, name: str, default: Optional[int], lo: int = 1, hi: int = MAX_SIZE) -> Optional[int]:
+    """Integer request parameter (JSON number or query string) within [lo, hi]; anything else is rejected."""
+    if v is None:
+        return default
+    if isinstance(v, str) and v.strip().lstrip("-").isdigit():
+        v = int(v)
+    if isinstance(v, bool) or not isinstance(v, int):
+        raise ValueError(f"{name} must be an integer.")
+    if not lo <= v <= hi:
+        raise ValueError(f"{name} must be between {lo} and {hi}.")
+    return v
+
+
+def _fields_key(fields: Any) -> Tuple[str, ...]:
+    """Field list -> hashable key. A single string is one field; anything but strings is rejected."""
+    if fields is None:
+        return ()
+    if isinstance(fields, str):
+        fields = [fields]
+    if not isinstance(fields, (list, tuple)) or not all(isinstance(f, str) and f.strip() for f in fields):
+        raise ValueError("fields must be a list of field names.")
+    return tuple(f.strip() for f in fields)
+
+
+def _filters_key(filters: Any) -> str:
+    """Validate filters (an object of column -> non-empty value) and serialize them into a hashable key."""
+    if filters is None:
+        return "{}"
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object of column -> value.")
+    for col, val in filters.items():
+        values = val if isinstance(val, list) else [val]
+        if not values or any(v is None or v == {} or (isinstance(v, str) and not v.strip()) for v in values):
+            raise ValueError(f"Filter '{col}' has an empty value.")
+    return json.dumps(filters, sort_keys=True, default=str)
+
+
+class QueryCoalescer:
+    """Run searches on a worker pool, sharing one call between identical in-flight requests."""
+
+    def __init__(self, pipe: BertDescriptionElser, workers: int = 8) -> None:
+        self.pipe = pipe
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search")
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple[Any, ...], Future] = {}
+        self.stats = {"requests": 0, "backend_calls": 0, "coalesced": 0}
+
+    def search(
+        self,
+        question: str,
+        size: int = 10,
+        hybrid: bool = True,
+        fields_to_return: Optional[Sequence[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        newest_first: bool = False,
+        with_graph: bool = False,
+    ) -> List[Dict[str, Any]]:
+        # Filters are part of the identity of a query; serialize them so the key is hashable
+        filters_key = _filters_key(filters)
+        return self._submit(
+            ("search", question.strip(), size, hybrid, _fields_key(fields_to_return), filters_key, newest_first,
+             with_graph)
+        )
+
+    def suggest(self, prefix: str, size: int = 5) -> List[Dict[str, Any]]:
+        return self._submit(("suggest", prefix.strip(), size))
+
+    def facets(
+        self,
+        question: str = "",
+        fields: Optional[Sequence[str]] = None,
+        size: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        hybrid: bool = True,
+        sample_size: Optional[int] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        filters_key = _filters_key(filters)
+        return self._submit(("facets", question.strip(), _fields_key(fields), size, filters_key, hybrid, sample_size))
+
+    def _submit(self, key: Tuple[Any, ...]) -> Any:
+        with self._lock:
+            self.stats["requests"] += 1
+            fut = self._in_flight.get(key)
+            if fut is None:
+                self.stats["backend_calls"] += 1
+                fut = self.pool.submit(self._run, key)
+                self._in_flight[key] = fut
+            else:
+                self.stats["coalesced"] += 1
+        return fut.result()
+
+    def _run(self, key: Tuple[Any, ...]) -> Any:
+        try:
+            if key[0] == "suggest":
+                _, prefix, size = key
+                return _records(self.pipe.suggest(prefix, size=size))
+            if key[0] == "facets":
+                _, question, fields, size, filters_key, hybrid, sample_size = key
+                return self.pipe.facets(
+                    question or None,
+                    fields=list(fields) or None,
+                    size=size,
+                    filters=json.loads(filters_key) or None,
+                    hybrid=hybrid,
+                    sample_size=sample_size,
+                )
+            _, question, size, hybrid, fields, filters_key, newest_first, with_graph = key
+            df = self.pipe.semantic_search(
+                question=question,
+                size=size,
+                hybrid=hybrid,
+                fields_to_return=list(fields) or None,
+                filters=json.loads(filters_key) or None,
+                newest_first=newest_first,
+                with_graph=with_graph,
+            )
+            return _records(df)
+        finally:
+            # Later identical queries must hit the backend again (results may have changed)
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive for clients that reuse connections
+    timeout = 5  # idle keep-alive connections are closed, so shutdown does not wait on them
+    server: "SearchServer"
+
+    def log_message(self, fmt: str, *args: Any) -> None:  # quieter than the default stderr spam
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/health":
+            try:
+                es_ok = bool(self.server.coalescer.pipe.es.ping())
+            except Exception:
+                es_ok = False
+            self._send(200 if es_ok else 503, {
+                "status": "ok" if es_ok else "degraded",
+                "elasticsearch": es_ok,
+                "in_flight": self.server.coalescer.in_flight,
+                **self.server.coalescer.stats,
+            })
+        elif url.path == "/search":
+            qs = parse_qs(url.query)
+            params = {k: v[-1] for k, v in qs.items()}
+            if "fields" in params:
+                params["fields"] = [f for f in params["fields"].split(",") if f]
+            self._search(params)
+        elif url.path == "/suggest":
+            qs = parse_qs(url.query)
+            prefix = (qs.get("q") or qs.get("prefix") or [""])[-1]
+            try:
+                hits = self.server.coalescer.suggest(prefix, size=_as_int((qs.get("size") or [None])[-1], "size", 5))
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            except Exception as e:
+                self._send(502, {"error": f"Suggest failed: {e}"})
+                return
+            self._send(200, {"prefix": prefix, "count": len(hits), "hits": hits})
+        else:
+            self._send(404, {"error": f"Unknown path: {url.path}"})
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        if url.path not in ("/search", "/facets"):
+            self._send(404, {"error": f"Unknown path: {url.path}"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": "Body must be JSON."})
+            return
+        if not isinstance(params, dict):
+            self._send(400, {"error": "Body must be a JSON object."})
+            return
+        if url.path == "/facets":
+            self._facets(params)
+        else:
+            self._search(params)
+
+    def _facets(self, params: Dict[str, Any]) -> None:
+        question = params.get("query") or params.get("q") or ""
+        try:
+            facets = self.server.coalescer.facets(
+                question,
+                fields=params.get("fields"),
+                size=_as_int(params.get("size"), "size", 10),
+                filters=params.get("filters"),
+                hybrid=_as_bool(params.get("hybrid"), self.server.default_hybrid),
+                sample_size=_as_int(params.get("sample_size"), "sample_size", None),
+            )
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send(502, {"error": f"Facets failed: {e}"})
+            return
+        self._send(200, {"query": question, "facets": facets})
+
+    def _search(self, params: Dict[str, Any]) -> None:
+        question = params.get("query") or params.get("q") or ""
+        try:
+            hits = self.server.coalescer.search(
+                question,
+                size=_as_int(params.get("size"), "size", self.server.default_size),
+                hybrid=_as_bool(params.get("hybrid"), self.server.default_hybrid),
+                fields_to_return=params.get("fields"),
+                filters=params.get("filters"),
+                newest_first=_as_bool(params.get("newest_first"), False),
+                with_graph=_as_bool(params.get("graph"), False),
+            )
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send(502, {"error": f"Search failed: {e}"})
+            return
+        self._send(200, {"query": question, "count": len(hits), "hits": hits})
+
+
+class SearchServer(ThreadingHTTPServer):
+    # Non-daemon handler threads: server_close() joins them, so in-flight responses are sent
+    daemon_threads = False
+
+    def __init__(
+        self,
+        pipe: BertDescriptionElser,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        workers: int = 8,
+        default_size: int = 10,
+        default_hybrid: bool = True,
+        verbose: bool = False,
+    ) -> None:
+        super().__init__((host, port), _Handler)
+        self.coalescer = QueryCoalescer(pipe, workers=workers)
+        self.default_size = default_size
+        self.default_hybrid = default_hybrid
+        self.verbose = verbose
+
+    def serve_until_signalled(self) -> None:
+        """Serve until SIGINT/SIGTERM, then stop accepting, drain in-flight searches and close."""
+        def _stop(signum, frame):
+            # shutdown() blocks until serve_forever returns, so call it off the main thread
+            threading.Thread(target=self.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGINT, _stop)
+        if hasattr(signal, "SIGTERM"):
+            signal.signal(signal.SIGTERM, _stop)
+        host, port = self.server_address[:2]
+        print(f"[INFO] Serving search on http://{host}:{port} (GET /health, GET|POST /search, GET /suggest, POST /facets)")
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            self.coalescer.shutdown()
+            print("[INFO] Search service stopped.")
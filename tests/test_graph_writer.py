@@ -0,0 +1,74 @@
+"""
+A failing graph write must surface as an error from load_graph, never hang it: the last
+batch is flushed after the writer has already taken the end-of-input sentinel.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+REPO = Path(__file__).resolve().parents[1]
+if str(REPO) not in sys.path:
+    sys.path.insert(0, str(REPO))
+
+pytest.importorskip("neo4j")  # imported by the loader; the driver never connects here
+
+
+class FailingSession:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, fn, *args):
+        raise RuntimeError("write failed")
+
+
+class FailingDriver:
+    def session(self):
+        return FailingSession()
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    monkeypatch.chdir(REPO)  # rules.yml is read relative to the working directory
+    import new
+
+    monkeypatch.setattr(new, "driver", FailingDriver())
+    return new
+
+
+def _load_in_thread(loader, rows):
+    outcome = {}
+
+    def target():
+        try:
+            loader.load_graph(rows, workers=0)
+        except BaseException as e:
+            outcome["error"] = e
+
+    t = threading.Thread(target=target, daemon=True)
+    t.start()
+    t.join(timeout=10)
+    assert not t.is_alive(), "load_graph hung after a failed write"
+    return outcome.get("error")
+
+
+def test_failed_final_flush_raises(loader):
+    # Fewer rows than BATCH_SIZE: the only flush happens after the sentinel
+    rows = loader.plan_records(pd.DataFrame({"description": [f"NAME: Person {i}" for i in range(10)]}))
+    error = _load_in_thread(loader, rows)
+    assert isinstance(error, RuntimeError)
+
+
+def test_failed_intermediate_flush_raises(loader, monkeypatch):
+    monkeypatch.setattr(loader, "BATCH_SIZE", 3)
+    monkeypatch.setattr(loader, "EXTRACT_CHUNK", 2)
+    monkeypatch.setattr(loader, "WRITE_QUEUE_SIZE", 1)
+    rows = loader.plan_records(pd.DataFrame({"description": [f"NAME: Person {i}" for i in range(50)]}))
+    error = _load_in_thread(loader, rows)
+    assert isinstance(error, RuntimeError)
@@ -0,0 +1,280 @@
+"""
+unified_ingest.py
+Single-pass ingest: read the spreadsheet once and feed Elasticsearch and Neo4j together.
+
+Design:
+- The source is streamed in DataFrame chunks (iter_table); nothing is parsed twice.
+- Each chunk is handed to every sink. A sink is a thread with its own bounded queue,
+  so a slow sink only holds the reader back once its queue is full, and the other
+  sink keeps working through what it already has.
+- ES sink: BertDescriptionElser.bulk_index_dataframe per chunk, one refresh at the end.
+- Graph sink: the new.py loader (rules.yml): stable ids de-duplicated across chunks,
+  unchanged-row skipping (unless FULL_RELOAD),
+  regex extraction on a process pool, batched UNWIND writes; derived same-flight
+  relationships and entity timestamps are written once at the end.
+- A failing chunk is recorded and the sink moves on; everything ends in one report.
+
+Usage:
+  python unified_ingest.py --file descriptions_only.xlsx --col description --reindex
+"""
+
+from __future__ import annotations
+
+import argparse
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from bert_elser_pipeline import BertDescriptionElser, iter_table
+
+MAX_SINK_ERRORS = 10  # a sink stops working (and only drains) after this many failed chunks
+
+
+class Sink(threading.Thread):
+    """Consumes chunks from a bounded queue; `handle(chunk)` returns the number of rows it wrote."""
+
+    def __init__(
+        self,
+        name: str,
+        handle: Callable[[pd.DataFrame], int],
+        finish: Optional[Callable[[], None]] = None,
+        queue_size: int = 4,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> None:
+        super().__init__(name=f"sink-{name}", daemon=True)
+        self.sink_name = name
+        self.handle = handle
+        self.finish = finish
+        self.queue: "queue.Queue[Optional[pd.DataFrame]]" = queue.Queue(maxsize=queue_size)
+        self.rows = 0
+        self.chunks = 0
+        self.seconds = 0.0
+        self.errors: List[str] = []
+        self.stats: Dict[str, int] = stats if stats is not None else {}  # sink-specific counters
+
+    @property
+    def stopped(self) -> bool:
+        return len(self.errors) >= MAX_SINK_ERRORS
+
+    def run(self) -> None:
+        while True:
+            chunk = self.queue.get()
+            if chunk is None:
+                break
+            self.chunks += 1
+            if self.stopped:
+                continue  # keep draining so the reader never blocks on us
+            t0 = time.perf_counter()
+            try:
+                self.rows += self.handle(chunk)
+            except Exception as e:
+                first, last = chunk.index[0] + 1, chunk.index[-1] + 1
+                self.errors.append(f"rows {first}-{last}: {type(e).__name__}: {e}")
+            self.seconds += time.perf_counter() - t0
+        if self.finish is not None and not self.stopped:
+            t0 = time.perf_counter()
+            try:
+                self.finish()
+            except Exception as e:
+                self.errors.append(f"finish: {type(e).__name__}: {e}")
+            self.seconds += time.perf_counter() - t0
+
+
+class IngestProgress:
+    """One status line for the reader and every sink."""
+
+    def __init__(self, sinks: List[Sink]) -> None:
+        self.sinks = sinks
+        self.read = 0
+        self.start = time.perf_counter()
+        self._last = 0.0
+
+    def show(self, force: bool = False) -> None:
+        now = time.perf_counter()
+        if not force and now - self._last < 0.5:
+            return
+        self._last = now
+        parts = [f"read {self.read}"]
+        for s in self.sinks:
+            parts.append(f"{s.sink_name} {s.rows} (queue {s.queue.qsize()})" + (" FAILED" if s.stopped else ""))
+        rate = self.read / max(now - self.start, 1e-9)
+        sys.stdout.write("\r  " + " | ".join(parts) + f" | {rate:,.0f} rows/s read")
+        sys.stdout.flush()
+
+
+def _put(sink: Sink, chunk: Optional[pd.DataFrame], progress: IngestProgress) -> None:
+    # Blocks while the sink's queue is full (backpressure), refreshing the status line meanwhile
+    while True:
+        try:
+            sink.queue.put(chunk, timeout=0.5)
+            return
+        except queue.Full:
+            progress.show()
+
+
+# --- SINKS ---
+def es_sink(pipe: BertDescriptionElser, reindex: bool, queue_size: int) -> Sink:
+    if reindex:
+        pipe.drop_index()
+    pipe.ensure_index()
+    pipe.ensure_pipeline()
+
+    def handle(chunk: pd.DataFrame) -> int:
+        if pipe.description_col not in chunk.columns:
+            raise ValueError(f"Required column '{pipe.description_col}' not found.")
+        pipe.bulk_index_dataframe(chunk, refresh=False)
+        return pipe.last_ingest_stats.get("indexed_rows", 0)
+
+    def finish() -> None:
+        pipe.es.indices.refresh(index=pipe.index_name)
+
+    return Sink("es", handle, finish, queue_size=queue_size)
+
+
+def graph_sink(description_col: str, workers: int, queue_size: int) -> Sink:
+    import graph_batch
+    import new as graph  # rules.yml graph loader; connects lazily
+
+    graph.ensure_schema()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    touched: Set[str] = set()
+    seen: Set[str] = set()  # record ids planned so far, so repeats in later chunks are not rewritten
+    stats = {"duplicates_skipped": 0, "unchanged_skipped": 0}
+
+    def handle(chunk: pd.DataFrame) -> int:
+        df = chunk.rename(columns={description_col: "description"})
+        if "description" not in df.columns:
+            raise ValueError(f"Required column '{description_col}' not found.")
+        planned = graph.plan_records(df, seen)
+        stats["duplicates_skipped"] += sum(1 for v in df["description"] if graph.clean_str(v)) - len(planned)
+        rows = graph_batch.skip_unchanged(graph.driver, graph.SCHEMA, planned, graph.FULL_RELOAD)
+        stats["unchanged_skipped"] += len(planned) - len(rows)
+        parts = list(graph.iter_row_chunks(rows, graph.EXTRACT_CHUNK))
+        extracted = pool.map(graph.extract_chunk, parts) if pool else map(graph.extract_chunk, parts)
+        with graph.driver.session() as session:
+            writer = graph_batch.BatchWriter(session, graph.new_batch, graph.BATCH_SIZE, touched)
+            for part in extracted:
+                writer.add_all(part)
+            writer.flush()
+        return writer.written
+
+    def finish() -> None:
+        if pool is not None:
+            pool.shutdown()
+        graph.touch_cached_entities()
+        graph.create_same_flight_relationships(touched)
+
+    return Sink("graph", handle, finish, queue_size=queue_size, stats=stats)
+
+
+def ingest(path: str, sinks: List[Sink], chunk_size: int) -> Tuple[IngestProgress, Optional[str]]:
+    """Read `path` once and fan every chunk out to all sinks. Returns (progress, reader error)."""
+    progress = IngestProgress(sinks)
+    reader_error: Optional[str] = None
+    for s in sinks:
+        s.start()
+    try:
+        for chunk in iter_table(path, chunk_size=chunk_size):
+            progress.read += len(chunk)
+            for s in sinks:
+                _put(s, chunk, progress)
+            progress.show()
+    except Exception as e:
+        # Sinks still finish what they received; the failure goes into the report
+        reader_error = f"{type(e).__name__}: {e}"
+    finally:
+        for s in sinks:
+            _put(s, None, progress)
+        for s in sinks:
+            while s.is_alive():
+                s.join(timeout=0.5)
+                progress.show()
+    progress.show(force=True)
+    print("")
+    return progress, reader_error
+
+
+def print_report(progress: IngestProgress, reader_error: Optional[str] = None) -> bool:
+    elapsed = time.perf_counter() - progress.start
+    print("=== Ingest report ===")
+    print(f"  source: {progress.read} rows read once in {elapsed:.2f}s")
+    if reader_error:
+        print(f"    [ERROR] reading stopped: {reader_error}")
+    ok = reader_error is None
+    for s in progress.sinks:
+        rate = s.rows / s.seconds if s.seconds else 0.0
+        extra = "".join(f", {v} {k.replace('_', ' ')}" for k, v in s.stats.items())
+        print(f"  {s.sink_name:6} {s.rows} rows written{extra} in {s.seconds:.2f}s busy ({rate:,.0f} rows/s), "
+              f"{s.chunks} chunks, {len(s.errors)} error(s)")
+        for err in s.errors:
+            print(f"    [ERROR] {err}")
+        if s.stopped:
+            print(f"    [ERROR] stopped after {MAX_SINK_ERRORS} failed chunks")
+        ok = ok and not s.errors
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Read a spreadsheet once and ingest it into Elasticsearch and Neo4j.")
+    ap.add_argument("--file", "-f", required=True, help="Path to .xlsx/.xls/.csv to ingest.")
+    ap.add_argument("--col", "-c", default="Description", help="Text column. Default: Description")
+    ap.add_argument("--chunk-size", type=int, default=2000, help="Rows per chunk handed to the sinks. Default: 2000")
+    ap.add_argument("--queue-size", type=int, default=4, help="Chunks buffered per sink. Default: 4")
+    ap.add_argument("--no-es", action="store_true", help="Skip the Elasticsearch sink.")
+    ap.add_argument("--no-graph", action="store_true", help="Skip the Neo4j sink.")
+    ap.add_argument("--reindex", action="store_true", help="Recreate the Elasticsearch index first.")
+    ap.add_argument("--index-name", default="chat_elser_description_only", help="Elasticsearch index name.")
+    ap.add_argument("--pipeline-id", default="elser_v2_description_only", help="Elasticsearch ingest pipeline id.")
+    ap.add_argument("--es-url", default="http://localhost:9200", help="Elasticsearch URL(s), comma-separated.")
+    ap.add_argument("--es-user", default="elastic", help="Elasticsearch username.")
+    ap.add_argument("--es-pass", default="changeme", help="Elasticsearch password.")
+    ap.add_argument("--model-id", default=".elser_model_2_linux-x86_64", help="ELSER model id.")
+    ap.add_argument("--bm25-only", action="store_true", help="Index without ELSER tokens.")
+    ap.add_argument("--ingest-threads", type=int, default=1, help="Parallel bulk workers in the ES sink. Default: 1")
+    ap.add_argument("--entity-rules", default=None, metavar="RULES_YML",
+                    help="Also index regex-extracted entities as keyword fields in ES.")
+    ap.add_argument("--graph-workers", type=int, default=None,
+                    help="Extraction processes in the graph sink. Default: the loader's EXTRACT_WORKERS")
+    args = ap.parse_args(argv)
+
+    sinks: List[Sink] = []
+    if not args.no_es:
+        pipe = BertDescriptionElser(
+            es_url=args.es_url,
+            es_user=args.es_user,
+            es_pass=args.es_pass,
+            index_name=args.index_name,
+            pipeline_id=args.pipeline_id,
+            model_id=args.model_id,
+            description_col=args.col,
+            use_ml=(not args.bm25_only),
+            ingest_threads=args.ingest_threads,
+            entity_rules=args.entity_rules,
+        )
+        sinks.append(es_sink(pipe, args.reindex, args.queue_size))
+    graph_driver = None
+    if not args.no_graph:
+        import new as graph
+
+        graph_driver = graph.driver
+        workers = graph.EXTRACT_WORKERS if args.graph_workers is None else args.graph_workers
+        sinks.append(graph_sink(args.col, workers, args.queue_size))
+    if not sinks:
+        raise SystemExit("Nothing to do: both sinks are disabled.")
+
+    try:
+        progress, reader_error = ingest(args.file, sinks, args.chunk_size)
+    finally:
+        if graph_driver is not None:
+            graph_driver.close()
+    if not print_report(progress, reader_error):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()